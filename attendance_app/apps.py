@@ -1,4 +1,11 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
 
 class AttendanceAppConfig(AppConfig):
-    name = 'attendance_app'
\ No newline at end of file
+    name = 'attendance_app'
+
+    def ready(self):
+        from .sqlite import configure_sqlite
+
+        # Tuning pragmas (and WAL when enabled) on every new SQLite connection
+        connection_created.connect(configure_sqlite, dispatch_uid='attendance_app.configure_sqlite')
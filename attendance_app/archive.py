@@ -0,0 +1,78 @@
+import calendar
+from datetime import date, datetime
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import ArchivedAttendanceLog, AttendanceLog, get_shift_date
+
+# Rows moved per transaction, so archiving never holds one long write lock
+ARCHIVE_CHUNK_SIZE = 5000
+
+ARCHIVE_FIELDS = ['id', 'user_id', 'timestamp', 'action', 'note', 'shift_date']
+
+
+def month_bounds(month):
+    """First and last day of a month given as a date, or a 'YYYY-MM' string."""
+    if isinstance(month, str):
+        month = datetime.strptime(month, '%Y-%m').date()
+    first = month.replace(day=1)
+    last = first.replace(day=calendar.monthrange(first.year, first.month)[1])
+    return first, last
+
+
+def archive_cutoff(months=None, today=None):
+    """
+    First shift date kept in AttendanceLog: the first day of the month ``months`` before today's shift month.
+
+    Archiving always moves whole months, so a month is either all hot or all archived.
+    """
+    if months is None:
+        months = settings.ATTENDANCE_LOG_RETENTION_MONTHS
+    today = today or get_shift_date(timezone.now())
+    month_index = today.year * 12 + today.month - 1 - months
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+
+def archive_logs(before, chunk_size=ARCHIVE_CHUNK_SIZE, progress=None):
+    """
+    Move every AttendanceLog of a shift before the given date into ArchivedAttendanceLog.
+
+    Each chunk is copied and deleted in one transaction, so an interrupted run
+    leaves no row in both tables or in neither. Returns the rows moved.
+    """
+    moved = 0
+    while True:
+        with transaction.atomic():
+            rows = list(
+                AttendanceLog.objects.filter(shift_date__lt=before)
+                .order_by('id')
+                .values_list(*ARCHIVE_FIELDS)[:chunk_size]
+            )
+            if not rows:
+                break
+            ArchivedAttendanceLog.objects.bulk_create(
+                [ArchivedAttendanceLog(**dict(zip(ARCHIVE_FIELDS, row))) for row in rows],
+                batch_size=1000,
+            )
+            AttendanceLog.objects.filter(id__in=[row[0] for row in rows]).delete()
+
+        moved += len(rows)
+        if progress:
+            progress(moved)
+    return moved
+
+
+def archived_logs(month):
+    """The archived logs of a month given as 'YYYY-MM'; raises ValueError for a malformed month."""
+    first, last = month_bounds(month)
+    return ArchivedAttendanceLog.objects.filter(shift_date__range=(first, last))
+
+
+def month_querysets(first, last):
+    """Querysets holding the logs of the shifts from first to last: the archive joins only for archived months."""
+    querysets = [AttendanceLog.objects.filter(shift_date__range=(first, last))]
+    if first < archive_cutoff():
+        querysets.append(ArchivedAttendanceLog.objects.filter(shift_date__range=(first, last)))
+    return querysets
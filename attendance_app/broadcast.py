@@ -0,0 +1,120 @@
+import asyncio
+import itertools
+import json
+import threading
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+from .models import UserPresence
+
+# Events a slow subscriber may fall behind before it is told to resync from a snapshot
+SUBSCRIBER_QUEUE_SIZE = 256
+
+# Put on a subscriber's queue in place of the events it missed
+RESYNC = object()
+
+
+class InProcessBroadcast:
+    """
+    Fan roster events out to every SSE subscriber of this process.
+
+    ``publish`` may be called from any thread (sync views, the scheduler);
+    events are handed to each subscriber's event loop with call_soon_threadsafe.
+    """
+
+    def __init__(self):
+        self.subscribers = set()
+        self.lock = threading.Lock()
+        self.sequence = itertools.count(1)
+
+    def subscribe(self):
+        """Register the calling coroutine's loop and return the queue its events arrive on."""
+        queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        with self.lock:
+            self.subscribers.add((asyncio.get_running_loop(), queue))
+        return queue
+
+    def unsubscribe(self, queue):
+        with self.lock:
+            self.subscribers = {(loop, q) for loop, q in self.subscribers if q is not queue}
+
+    def publish(self, event):
+        self.deliver(event)
+
+    def deliver(self, event):
+        """Hand an event to every local subscriber."""
+        event = dict(event, id=next(self.sequence))
+        with self.lock:
+            subscribers = list(self.subscribers)
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(self._enqueue, queue, event)
+            except RuntimeError:
+                # The subscriber's loop is already closed
+                self.unsubscribe(queue)
+
+    @staticmethod
+    def _enqueue(queue, event):
+        try:
+            queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Too far behind: drop what is queued and make it reload a snapshot
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait(RESYNC)
+
+
+class RedisBroadcast(InProcessBroadcast):
+    """
+    Share roster events between worker processes through a Redis pub/sub channel.
+
+    Each process publishes to the channel and relays everything it receives to
+    its own subscribers, so every dashboard sees every worker's events.
+    """
+
+    def __init__(self, url=None, channel='attendance:roster'):
+        super().__init__()
+        import redis
+
+        self.channel = channel
+        self.client = redis.Redis.from_url(url or settings.ROSTER_BROADCAST_URL)
+        self.listener = threading.Thread(target=self._listen, name='roster-broadcast', daemon=True)
+        self.listener.start()
+
+    def publish(self, event):
+        self.client.publish(self.channel, json.dumps(event))
+
+    def _listen(self):
+        pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(self.channel)
+        for message in pubsub.listen():
+            self.deliver(json.loads(message['data']))
+
+
+@lru_cache(maxsize=None)
+def get_broadcast():
+    """The process-wide broadcast hub, of the class named by ROSTER_BROADCAST_BACKEND."""
+    return import_string(settings.ROSTER_BROADCAST_BACKEND)()
+
+
+def roster_event(user_id, username, action, at):
+    """Small event describing one user's new roster state."""
+    return {
+        'user_id': user_id,
+        'username': username,
+        'action': action,
+        'state': UserPresence.ACTION_STATES.get(action, UserPresence.IDLE),
+        'at': at.isoformat(),
+    }
+
+
+def publish_roster_events(events):
+    """Publish events once the current transaction commits, so nobody sees an action that rolled back."""
+    def publish():
+        broadcast = get_broadcast()
+        for event in events:
+            broadcast.publish(event)
+    transaction.on_commit(publish)
@@ -0,0 +1,333 @@
+import csv
+import json
+from datetime import timedelta
+from functools import lru_cache
+
+from django.db.models import Max
+from django.db.models.functions import Length
+from django.utils import timezone
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Border, Font, NamedStyle, PatternFill, Side
+from openpyxl.utils import get_column_letter
+from openpyxl.worksheet.worksheet import Worksheet
+from .models import AttendanceLog
+
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+# Rows fetched per database round trip when streaming exports
+EXPORT_CHUNK_SIZE = 2000
+
+ACTIVITY_HEADERS = ["Date", "Time", "Action", "Status", "Note"]
+SUMMARY_HEADERS = ["Username"] + ACTIVITY_HEADERS
+
+# Column width rules: longest value plus padding, never narrower than the minimum
+COLUMN_WIDTH_PADDING = 2
+MIN_COLUMN_WIDTH = 12
+
+# Fixed lengths of the formatted date ("2025-04-19") and time ("02:12 PM") columns
+DATE_LENGTH = 10
+TIME_LENGTH = 8
+
+
+# Plain-text export formats streamed without any styling
+TEXT_EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+}
+
+
+@lru_cache(maxsize=None)
+def format_action(action):
+    """Return the (label, status) pair shown for a log action in exports."""
+    label = action.replace('_', ' ').title()
+
+    if 'Clock In' in label:
+        status = "Working"
+    elif 'Clock Out' in label:
+        status = "Off Duty"
+    elif 'Start Break' in label or 'Start Lunch' in label:
+        status = "On Break"
+    elif 'End Break' in label or 'End Lunch' in label:
+        status = "Back to Work"
+    else:
+        status = ""
+
+    return label, status
+
+
+# Longest status text format_action can produce
+MAX_STATUS_LENGTH = len("Back to Work")
+
+
+class ColumnWidthTracker:
+    """
+    Remember the longest value per column while rows are written.
+
+    Widths are applied once at the end for normal sheets, or before the first
+    row for write-only sheets (seeded with lengths computed by the database).
+    """
+
+    def __init__(self):
+        self.max_lengths = {}
+
+    def track(self, values, start_column=1):
+        """Record the string length of each value in a row."""
+        max_lengths = self.max_lengths
+        for col_idx, value in enumerate(values, start_column):
+            if value:
+                length = len(str(value))
+                if length > max_lengths.get(col_idx, 0):
+                    max_lengths[col_idx] = length
+
+    def track_length(self, col_idx, length):
+        """Record a known length for a column without having the value at hand."""
+        if length and length > self.max_lengths.get(col_idx, 0):
+            self.max_lengths[col_idx] = length
+
+    def apply(self, sheet):
+        """Set the column widths on the sheet."""
+        for col_idx, length in self.max_lengths.items():
+            sheet.column_dimensions[get_column_letter(col_idx)].width = max(length + COLUMN_WIDTH_PADDING, MIN_COLUMN_WIDTH)
+
+
+def activity_width_tracker(headers, max_action_length, max_note_length, max_username_length=None):
+    """
+    Build a tracker for an activity sheet from length aggregates, before any row is written.
+
+    Columns follow ACTIVITY_HEADERS, shifted right by one when a Username column leads.
+    """
+    tracker = ColumnWidthTracker()
+    tracker.track(headers)
+
+    offset = 0
+    if max_username_length is not None:
+        tracker.track_length(1, max_username_length)
+        offset = 1
+
+    tracker.track_length(offset + 1, DATE_LENGTH)
+    tracker.track_length(offset + 2, TIME_LENGTH)
+    # Labels keep the action's length, underscores just become spaces
+    tracker.track_length(offset + 3, max_action_length)
+    tracker.track_length(offset + 4, MAX_STATUS_LENGTH)
+    tracker.track_length(offset + 5, max_note_length)
+    return tracker
+
+
+def register_export_styles(wb):
+    """Register the shared named styles used by every exported sheet."""
+    thin = Side(style='thin')
+    thin_border = Border(left=thin, right=thin, top=thin, bottom=thin)
+
+    wb.add_named_style(NamedStyle(
+        name='export_header',
+        font=Font(bold=True, size=12, color='FFFFFF'),
+        fill=PatternFill(start_color="4F81BD", end_color="4F81BD", fill_type="solid"),
+        alignment=Alignment(horizontal='center', vertical='center'),
+        border=thin_border,
+    ))
+    wb.add_named_style(NamedStyle(
+        name='export_title',
+        font=Font(bold=True, size=14),
+        alignment=Alignment(horizontal='center'),
+    ))
+    wb.add_named_style(NamedStyle(name='export_row', border=thin_border))
+    wb.add_named_style(NamedStyle(
+        name='export_alt_row',
+        border=thin_border,
+        fill=PatternFill(start_color="F2F2F2", end_color="F2F2F2", fill_type="solid"),
+    ))
+
+
+def styled_row(sheet, values, style):
+    """Build a row of write-only cells sharing one named style."""
+    cells = []
+    for value in values:
+        cell = WriteOnlyCell(sheet, value=value)
+        cell.style = style
+        cells.append(cell)
+    return cells
+
+
+def create_streaming_sheet(wb, title, width_tracker):
+    """Create a write-only sheet with its column widths and print setup already applied."""
+    sheet = wb.create_sheet(title=title)
+    width_tracker.apply(sheet)
+    sheet.page_setup.orientation = Worksheet.ORIENTATION_LANDSCAPE
+    sheet.page_setup.fitToWidth = True
+    return sheet
+
+
+def write_streaming_admin_workbook(output, user_id=None, chunk_size=EXPORT_CHUNK_SIZE, progress=None):
+    """
+    Write the all-users activity workbook to a file object using write-only sheets.
+
+    Logs are read in chunks and each row goes straight to disk, so memory stays
+    flat no matter how many rows are exported. ``progress`` is called with the
+    rows written so far after every chunk. Returns the number of log rows written.
+    """
+    wb = Workbook(write_only=True)
+    register_export_styles(wb)
+
+    logs = AttendanceLog.objects.all()
+    if user_id:
+        logs = logs.filter(user_id=user_id)
+
+    # Column widths must be known up front: one grouped query gives the longest values per user
+    user_lengths = {
+        row['user_id']: row
+        for row in logs.values('user_id').annotate(
+            max_action=Max(Length('action')),
+            max_note=Max(Length('note')),
+            username_length=Max(Length('user__username')),
+        ).order_by()
+    }
+    summary_widths = activity_width_tracker(
+        SUMMARY_HEADERS,
+        max((row['max_action'] or 0 for row in user_lengths.values()), default=0),
+        max((row['max_note'] or 0 for row in user_lengths.values()), default=0),
+        max((row['username_length'] or 0 for row in user_lengths.values()), default=0),
+    )
+
+    summary_sheet = create_streaming_sheet(wb, "Summary", summary_widths)
+    summary_sheet.print_title_rows = '1:1'
+    summary_sheet.append(styled_row(summary_sheet, SUMMARY_HEADERS, 'export_header'))
+
+    logs = logs.order_by('user__username', 'user_id', '-timestamp').values_list(
+        'user_id', 'user__username', 'user__first_name', 'user__last_name',
+        'timestamp', 'action', 'note',
+    )
+
+    created_sheet_names = set(["Summary"])
+    current_user_id = None
+    user_sheet = None
+    summary_row = 2
+    user_row = 3
+    rows_written = 0
+
+    for log_user_id, username, first_name, last_name, timestamp, action, note in logs.iterator(chunk_size=chunk_size):
+        if log_user_id != current_user_id:
+            # Finish the previous user's sheet so its temp file is released
+            if user_sheet is not None:
+                user_sheet.close()
+            current_user_id = log_user_id
+
+            # Ensure unique sheet names by adding numbers if needed (Excel limits names length)
+            base_sheet_name = f"{username[:20]}"
+            sheet_name = base_sheet_name
+            counter = 1
+            while sheet_name in created_sheet_names:
+                sheet_name = f"{base_sheet_name}_{counter}"
+                counter += 1
+            created_sheet_names.add(sheet_name)
+
+            lengths = user_lengths[log_user_id]
+            user_widths = activity_width_tracker(ACTIVITY_HEADERS, lengths['max_action'], lengths['max_note'])
+            user_sheet = create_streaming_sheet(wb, sheet_name, user_widths)
+            user_sheet.print_title_rows = '1:2'
+            user_sheet.append(styled_row(
+                user_sheet,
+                [f"Activity Log for: {first_name} {last_name} ({username})"],
+                'export_title',
+            ))
+            # Write-only sheets still write merged ranges: the title spans the columns as in the classic export
+            user_sheet.merged_cells.add(f'A1:{get_column_letter(len(ACTIVITY_HEADERS))}1')
+            user_sheet.append(styled_row(user_sheet, ACTIVITY_HEADERS, 'export_header'))
+            user_row = 3
+
+        local_timestamp = timezone.localtime(timestamp)
+        label, status = format_action(action)
+        values = [
+            local_timestamp.strftime('%Y-%m-%d'),
+            local_timestamp.strftime('%I:%M %p'),
+            label,
+            status,
+            note or "",
+        ]
+
+        user_sheet.append(styled_row(
+            user_sheet, values, 'export_alt_row' if user_row % 2 == 0 else 'export_row'
+        ))
+        user_row += 1
+
+        summary_sheet.append(styled_row(
+            summary_sheet, [username] + values, 'export_alt_row' if summary_row % 2 == 0 else 'export_row'
+        ))
+        summary_row += 1
+        rows_written += 1
+
+        if progress and rows_written % chunk_size == 0:
+            progress(rows_written)
+
+    wb.save(output)
+    return rows_written
+
+
+class LocalTimeConverter:
+    """
+    Convert UTC timestamps to the current timezone, caching the offset per UTC hour.
+
+    Much cheaper than timezone.localtime for millions of rows, while still
+    honouring any DST change in the configured zone.
+    """
+
+    def __init__(self):
+        self.tz = timezone.get_current_timezone()
+        self.offsets = {}
+
+    def __call__(self, timestamp):
+        hour = timestamp.replace(minute=0, second=0, microsecond=0)
+        offset = self.offsets.get(hour)
+        if offset is None:
+            offset = self.offsets[hour] = hour.astimezone(self.tz).utcoffset() or timedelta(0)
+        return (timestamp + offset).replace(tzinfo=None)
+
+
+class Echo:
+    """File-like object whose write just hands back the value, for streaming csv.writer output."""
+
+    def write(self, value):
+        return value
+
+
+def iter_activity_rows(logs, include_username=False, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Yield formatted activity rows straight from values_list tuples, in chunks.
+
+    ``logs`` must already be ordered; no model instances are created.
+    """
+    to_local = LocalTimeConverter()
+    fields = ['timestamp', 'action', 'note']
+    if include_username:
+        fields = ['user__username'] + fields
+
+    for values in logs.values_list(*fields).iterator(chunk_size=chunk_size):
+        if include_username:
+            username, timestamp, action, note = values
+        else:
+            timestamp, action, note = values
+        local_timestamp = to_local(timestamp)
+        label, status = format_action(action)
+        row = [
+            local_timestamp.strftime('%Y-%m-%d'),
+            local_timestamp.strftime('%I:%M %p'),
+            label,
+            status,
+            note or "",
+        ]
+        if include_username:
+            row.insert(0, username)
+        yield row
+
+
+def stream_text_export(rows, headers, export_format):
+    """Yield the encoded lines of a csv or jsonl export, one row at a time."""
+    if export_format == 'csv':
+        writer = csv.writer(Echo())
+        yield writer.writerow(headers)
+        for row in rows:
+            yield writer.writerow(row)
+    else:
+        keys = [header.lower() for header in headers]
+        for row in rows:
+            yield json.dumps(dict(zip(keys, row))) + '\n'
@@ -0,0 +1,183 @@
+import csv
+import datetime
+import json
+from collections import Counter
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+
+from .models import AttendanceLog, DailyTimeAllocation, get_shift_date
+from .transitions import INTERVALS, TRACKER_ACTIONS
+
+# Rows committed per transaction; a resumed import restarts at a chunk boundary
+IMPORT_CHUNK_SIZE = 5000
+# Rows per INSERT statement inside a chunk
+IMPORT_BATCH_SIZE = 1000
+
+MINUTES_FIELDS = {kind: minutes_field for kind, (_, minutes_field, _) in INTERVALS.items()}
+
+
+class ImportRowError(ValueError):
+    """A badge row that cannot become an AttendanceLog: ``args`` are (reason, offending value)."""
+
+
+def read_badge_rows(stream, input_format):
+    """Yield the rows of a csv (with a header line) or jsonl badge dump as dicts."""
+    if input_format == 'csv':
+        yield from csv.DictReader(stream)
+    else:
+        for line in stream:
+            if line.strip():
+                yield json.loads(line)
+
+
+def parse_timestamp(value):
+    """An aware UTC datetime from an ISO 8601 value; naive values are in the configured time zone."""
+    try:
+        moment = datetime.datetime.fromisoformat(value.strip())
+    except (AttributeError, ValueError):
+        raise ImportRowError('bad timestamp', value)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment.astimezone(datetime.timezone.utc)
+
+
+class BadgeImport:
+    """
+    Stream badge-reader rows into AttendanceLog and DailyTimeAllocation.
+
+    Rows need ``username``, ``timestamp`` and ``action`` (one of TRACKER_ACTIONS),
+    plus an optional ``note``, in time order per user. Each chunk of rows is
+    written in one transaction: its logs with bulk_create, and the break and
+    lunch minutes of the intervals it closed added to the shift's allocation.
+    """
+
+    def __init__(self, create_users=False, chunk_size=IMPORT_CHUNK_SIZE):
+        self.create_users = create_users
+        self.chunk_size = chunk_size
+        self.user_ids = dict(User.objects.values_list('username', 'id'))
+        # (user id, interval kind) -> start timestamp of the interval still open
+        self.open_intervals = {}
+        self.imported = 0
+        self.rejected = Counter()
+
+    def run(self, rows, start_offset=0, progress=None):
+        """Import rows from start_offset on; calls progress(offset) after each committed chunk."""
+        rows = iter(rows)
+        self.replay(islice(rows, start_offset))
+        offset = start_offset
+        while True:
+            chunk = list(islice(rows, self.chunk_size))
+            if not chunk:
+                break
+            self.import_chunk(chunk)
+            offset += len(chunk)
+            if progress:
+                progress(offset)
+        return offset
+
+    def replay(self, rows):
+        """
+        Pair the intervals of rows an earlier run already committed, writing nothing.
+
+        A resumed import needs the breaks and lunches those rows left open, or the
+        minutes of their ends past start_offset would be dropped.
+        """
+        for row in rows:
+            try:
+                log = self.build_log(row)
+            except ImportRowError:
+                continue
+            self.track_interval(log, {})
+
+    def import_chunk(self, chunk):
+        if self.create_users:
+            self.add_missing_users({row.get('username') for row in chunk} - self.user_ids.keys() - {None, ''})
+
+        logs = []
+        minutes_by_shift = {}
+        for row in chunk:
+            try:
+                log = self.build_log(row)
+            except ImportRowError as error:
+                self.rejected[error.args[0]] += 1
+                continue
+            logs.append(log)
+            self.track_interval(log, minutes_by_shift)
+
+        with transaction.atomic():
+            AttendanceLog.objects.bulk_create(logs, batch_size=IMPORT_BATCH_SIZE)
+            self.add_allocation_minutes(minutes_by_shift)
+        self.imported += len(logs)
+
+    def build_log(self, row):
+        action = (row.get('action') or '').strip()
+        if action not in TRACKER_ACTIONS:
+            raise ImportRowError('unknown action', action)
+        user_id = self.user_ids.get(row.get('username'))
+        if user_id is None:
+            raise ImportRowError('unknown username', row.get('username'))
+        timestamp = parse_timestamp(row.get('timestamp'))
+
+        return AttendanceLog(
+            user_id=user_id,
+            timestamp=timestamp,
+            action=action,
+            note=row.get('note') or None,
+            shift_date=get_shift_date(timestamp),
+        )
+
+    def track_interval(self, log, minutes_by_shift):
+        """Pair break/lunch starts with their ends, adding the minutes to the end's shift."""
+        verb, _, kind = log.action.partition('_')
+        if kind not in INTERVALS:
+            return
+        if verb == 'start':
+            self.open_intervals[log.user_id, kind] = log.timestamp
+            return
+
+        started = self.open_intervals.pop((log.user_id, kind), None)
+        if started is None:
+            return
+        minutes = minutes_by_shift.setdefault((log.user_id, log.shift_date), dict.fromkeys(INTERVALS, 0))
+        minutes[kind] += int((log.timestamp - started).total_seconds() // 60)
+
+    def add_allocation_minutes(self, minutes_by_shift):
+        """Add this chunk's minutes to existing allocations and create the missing ones."""
+        if not minutes_by_shift:
+            return
+        user_ids = {user_id for user_id, _ in minutes_by_shift}
+        dates = {shift_date for _, shift_date in minutes_by_shift}
+        existing = {
+            (allocation.user_id, allocation.date): allocation
+            for allocation in DailyTimeAllocation.objects.filter(user_id__in=user_ids, date__in=dates)
+        }
+
+        updated = []
+        created = []
+        for (user_id, shift_date), minutes in minutes_by_shift.items():
+            allocation = existing.get((user_id, shift_date))
+            if allocation is None:
+                allocation = DailyTimeAllocation(user_id=user_id, date=shift_date)
+                created.append(allocation)
+            else:
+                updated.append(allocation)
+            for kind, used in minutes.items():
+                field = MINUTES_FIELDS[kind]
+                setattr(allocation, field, getattr(allocation, field) + used)
+
+        DailyTimeAllocation.objects.bulk_update(updated, list(MINUTES_FIELDS.values()), batch_size=IMPORT_BATCH_SIZE)
+        DailyTimeAllocation.objects.bulk_create(created, batch_size=IMPORT_BATCH_SIZE)
+
+    def add_missing_users(self, usernames):
+        """Create badge holders with no account yet, with unusable passwords."""
+        if not usernames:
+            return
+        User.objects.bulk_create(
+            [User(username=username, password=make_password(None)) for username in usernames],
+            ignore_conflicts=True,
+        )
+        self.user_ids.update(User.objects.filter(username__in=usernames).values_list('username', 'id'))
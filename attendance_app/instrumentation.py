@@ -0,0 +1,187 @@
+import logging
+import re
+import time
+from collections import defaultdict
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connection
+from django.template.backends.django import DjangoTemplates
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+# Timings of the request being handled, None outside instrumented requests
+_current_timings = ContextVar('request_timings', default=None)
+
+# SQL fingerprints: literals and placeholder lists collapse, so one query shape counts once
+_NUMBER = re.compile(r'\b\d+\b')
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_IN_LIST = re.compile(r'\bIN \((?:%s|\?)(?:, (?:%s|\?))*\)')
+_WHITESPACE = re.compile(r'\s+')
+
+# Offending query shapes listed in an over-budget warning
+BUDGET_WARNING_FINGERPRINTS = 5
+
+
+def sql_fingerprint(sql):
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _IN_LIST.sub('IN (...)', sql)
+    return _WHITESPACE.sub(' ', sql).strip()
+
+
+class RequestTimings:
+    """Query count, SQL time and template render time of one request."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.template_seconds = 0.0
+        self.response_bytes = 0
+        # Raw SQL -> [executions, seconds]; fingerprinted only when a budget is exceeded
+        self.statements = defaultdict(lambda: [0, 0.0])
+
+    def __call__(self, execute, sql, params, many, context):
+        """connection.execute_wrapper hook timing every query."""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.queries += 1
+            self.sql_seconds += elapsed
+            statement = self.statements[sql]
+            statement[0] += 1
+            statement[1] += elapsed
+
+    def fingerprints(self):
+        """Executions and seconds per SQL fingerprint: {fingerprint: [executions, seconds]}."""
+        shapes = defaultdict(lambda: [0, 0.0])
+        for sql, (count, seconds) in self.statements.items():
+            shape = shapes[sql_fingerprint(sql)]
+            shape[0] += count
+            shape[1] += seconds
+        return shapes
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def server_timing(self):
+        """Server-Timing header value; streamed bodies are produced after it is sent."""
+        return (
+            f'db;dur={self.sql_seconds * 1000:.1f};desc="{self.queries} queries", '
+            f'tpl;dur={self.template_seconds * 1000:.1f}, '
+            f'total;dur={self.elapsed() * 1000:.1f}'
+        )
+
+
+class InstrumentedTemplate:
+    """Template wrapper adding its render time to the current request's timings."""
+
+    def __init__(self, template):
+        self.template = template
+
+    @property
+    def origin(self):
+        return self.template.origin
+
+    def render(self, context=None, request=None):
+        timings = _current_timings.get()
+        if timings is None:
+            return self.template.render(context, request)
+        started = time.perf_counter()
+        try:
+            return self.template.render(context, request)
+        finally:
+            timings.template_seconds += time.perf_counter() - started
+
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+    """Django template backend whose templates report their render time to RequestInstrumentationMiddleware."""
+
+    def from_string(self, template_code):
+        return InstrumentedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return InstrumentedTemplate(super().get_template(template_name))
+
+
+class RequestInstrumentationMiddleware:
+    """
+    Measure every request: query count, SQL time, template render time, size and duration.
+
+    The measurements go to the process histograms in metrics.py (per url name),
+    and a Server-Timing header. A request over its REQUEST_BUDGETS entry logs a
+    warning listing its most frequent SQL fingerprints. Streamed bodies are
+    measured as they are sent.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timings = RequestTimings()
+        token = _current_timings.set(timings)
+        try:
+            with connection.execute_wrapper(timings):
+                response = self.get_response(request)
+        finally:
+            _current_timings.reset(token)
+
+        view = request.resolver_match.url_name if request.resolver_match else None
+        if view in settings.REQUEST_METRICS_EXCLUDE:
+            return response
+
+        response['Server-Timing'] = timings.server_timing()
+        if response.streaming:
+            if not response.is_async:
+                response.streaming_content = self.measure_stream(response.streaming_content, timings, view, request)
+            return response
+
+        timings.response_bytes = len(response.content)
+        self.record(timings, view or 'unmatched', request)
+        return response
+
+    def measure_stream(self, content, timings, view, request):
+        """Yield a streamed body, still counting its queries, then record the request."""
+        try:
+            with connection.execute_wrapper(timings):
+                for chunk in content:
+                    timings.response_bytes += len(chunk)
+                    yield chunk
+        finally:
+            self.record(timings, view or 'unmatched', request)
+
+    def record(self, timings, view, request):
+        duration = timings.elapsed()
+        metrics.increment('requests')
+        metrics.observe('request_duration_seconds', view, duration)
+        metrics.observe('request_sql_seconds', view, timings.sql_seconds)
+        metrics.observe('request_template_seconds', view, timings.template_seconds)
+        metrics.observe('request_queries', view, timings.queries)
+        metrics.observe('response_bytes', view, timings.response_bytes)
+
+        budget = settings.REQUEST_BUDGETS.get(view)
+        if not budget:
+            return
+        exceeded = []
+        if timings.queries > budget.get('queries', float('inf')):
+            exceeded.append(f'{timings.queries} queries > {budget["queries"]}')
+        if duration * 1000 > budget.get('duration_ms', float('inf')):
+            exceeded.append(f'{duration * 1000:.0f} ms > {budget["duration_ms"]} ms')
+        if not exceeded:
+            return
+
+        metrics.increment('request_budget_exceeded')
+        shapes = sorted(timings.fingerprints().items(), key=lambda item: (-item[1][0], -item[1][1]))
+        logger.warning(
+            'Request budget exceeded for %s %s (%s): %s\n%s',
+            request.method, request.path, view, ', '.join(exceeded),
+            '\n'.join(
+                f'  {count}x {seconds * 1000:.1f} ms  {fingerprint}'
+                for fingerprint, (count, seconds) in shapes[:BUDGET_WARNING_FINGERPRINTS]
+            ),
+        )
@@ -0,0 +1,143 @@
+import hashlib
+import json
+import os
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .exports import write_streaming_admin_workbook
+from .models import AttendanceLog, ExportJob
+
+
+def export_params_hash(params):
+    """Stable hash of the export parameters, used to deduplicate jobs."""
+    return hashlib.sha1(json.dumps(params, sort_keys=True).encode()).hexdigest()
+
+
+def enqueue_export(requested_by, params):
+    """
+    Return a job for these parameters, reusing a pending, running or recently
+    finished one instead of queueing another full table scan.
+
+    Two identical requests racing past the lookup cannot both queue a job:
+    exportjob_active_params_uniq rejects the second, which gets the first's job.
+    """
+    params_hash = export_params_hash(params)
+    fail_stale_jobs()
+    fresh_since = timezone.now() - timedelta(seconds=settings.EXPORT_JOB_TTL_SECONDS)
+
+    with transaction.atomic():
+        existing = ExportJob.objects.filter(
+            params_hash=params_hash,
+            status__in=[ExportJob.PENDING, ExportJob.RUNNING, ExportJob.DONE],
+            created_at__gte=fresh_since,
+        ).order_by('-created_at').first()
+        if existing:
+            return existing, False
+
+        try:
+            with transaction.atomic():
+                job = ExportJob.objects.create(requested_by=requested_by, params=params, params_hash=params_hash)
+        except IntegrityError:
+            return ExportJob.objects.get(params_hash=params_hash, status__in=[ExportJob.PENDING, ExportJob.RUNNING]), False
+    return job, True
+
+
+def claim_next_job():
+    """Atomically move the oldest pending job to running. Returns None when the queue is empty."""
+    while True:
+        job = ExportJob.objects.filter(status=ExportJob.PENDING).order_by('created_at').first()
+        if job is None:
+            return None
+
+        # Conditional update so two workers never pick the same job
+        now = timezone.now()
+        claimed = ExportJob.objects.filter(pk=job.pk, status=ExportJob.PENDING).update(
+            status=ExportJob.RUNNING,
+            started_at=now,
+            heartbeat_at=now,
+        )
+        if claimed:
+            job.refresh_from_db()
+            return job
+
+
+def run_export_job(job):
+    """Generate the job's workbook on disk, reporting rows-processed progress as it goes."""
+    user_id = job.params.get('user')
+
+    if user_id:
+        username = User.objects.filter(id=user_id).values_list('username', flat=True).first()
+        filename_prefix = f"user_{username}_activity"
+    else:
+        filename_prefix = "all_users_activity"
+    filename = f"{filename_prefix}_{datetime.now().strftime('%B_%Y')}.xlsx"
+
+    logs = AttendanceLog.objects.all()
+    if user_id:
+        logs = logs.filter(user_id=user_id)
+    ExportJob.objects.filter(pk=job.pk).update(total_rows=logs.count())
+
+    os.makedirs(settings.EXPORT_ROOT, exist_ok=True)
+    file_path = os.path.join(settings.EXPORT_ROOT, f"export_{job.pk}.xlsx")
+
+    def report(rows_processed):
+        # Each progress write is also the heartbeat that keeps the job from counting as abandoned
+        ExportJob.objects.filter(pk=job.pk).update(rows_processed=rows_processed, heartbeat_at=timezone.now())
+
+    try:
+        with open(file_path, 'wb') as output:
+            rows_processed = write_streaming_admin_workbook(output, user_id=user_id, progress=report)
+    except Exception as exc:
+        if os.path.exists(file_path):
+            os.remove(file_path)
+        ExportJob.objects.filter(pk=job.pk).update(
+            status=ExportJob.FAILED,
+            error=str(exc),
+            finished_at=timezone.now(),
+        )
+        raise
+
+    ExportJob.objects.filter(pk=job.pk).update(
+        status=ExportJob.DONE,
+        rows_processed=rows_processed,
+        file_path=file_path,
+        filename=filename,
+        finished_at=timezone.now(),
+    )
+    job.refresh_from_db()
+    return job
+
+
+def fail_stale_jobs():
+    """
+    Fail running jobs without progress for EXPORT_JOB_TIMEOUT_SECONDS, whose
+    worker was most likely killed. Returns the number of jobs failed.
+    """
+    silent_since = timezone.now() - timedelta(seconds=settings.EXPORT_JOB_TIMEOUT_SECONDS)
+    return ExportJob.objects.filter(status=ExportJob.RUNNING, heartbeat_at__lt=silent_since).update(
+        status=ExportJob.FAILED,
+        error='The export worker stopped before finishing this job.',
+        finished_at=timezone.now(),
+    )
+
+
+def purge_expired_exports():
+    """Delete finished artifacts older than the reuse TTL. Returns the number of jobs purged."""
+    fail_stale_jobs()
+    expired_before = timezone.now() - timedelta(seconds=settings.EXPORT_JOB_TTL_SECONDS)
+    expired = ExportJob.objects.filter(
+        status__in=[ExportJob.DONE, ExportJob.FAILED],
+        created_at__lt=expired_before,
+    )
+
+    purged = 0
+    for job in expired.iterator():
+        if job.file_path and os.path.exists(job.file_path):
+            os.remove(job.file_path)
+        purged += 1
+    expired.delete()
+    return purged
@@ -0,0 +1,333 @@
+import os
+import re
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time as time_module
+import uuid
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from http.cookiejar import CookieJar
+from http.cookies import SimpleCookie
+from urllib.error import HTTPError, URLError
+from urllib.parse import urlencode
+from urllib.request import HTTPCookieProcessor, HTTPRedirectHandler, Request, build_opener
+
+from django.contrib import messages
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.core.management import call_command
+from django.db import OperationalError, connection, connections
+from django.test import Client
+
+from .models import AttendanceLog, DailyTimeAllocation, UserPresence
+from .sqlite import is_lock_error
+from .transitions import INTERVALS
+
+# Tracker actions of one night shift, in the order an agent sends them
+SHIFT_SEQUENCE = [
+    'clock_in',
+    'start_break1', 'end_break1',
+    'start_lunch', 'end_lunch',
+    'start_break2', 'end_break2',
+    'clock_out',
+]
+
+# Minutes written into an end_* log note by the tracker
+DURATION_NOTE = re.compile(r'duration: (\d+) minutes')
+
+OK = 'ok'
+# Redirected with an error message (e.g. the losing end of a double-submitted break)
+REFUSED = 'refused'
+# Redirected with "That action was already recorded" (the other half of a double submit)
+DEDUPLICATED = 'deduplicated'
+LOCK_ERROR = 'lock_error'
+SERVER_ERROR = 'server_error'
+
+# Outcomes of requests that did what the tracker should do with them
+EXPECTED_OUTCOMES = {OK, REFUSED, DEDUPLICATED}
+
+# Seconds between a tracker's own clock read and the timestamp of the log it then writes
+TIMESTAMP_SLACK_SECONDS = 1.0
+
+
+class InProcessAgent:
+    """A simulated agent driving the WSGI app in-process through the test client."""
+
+    def __init__(self, username, password):
+        self.username = username
+        self.password = password
+        self.client = Client(raise_request_exception=True)
+
+    def login(self):
+        response = self.client.post('/', {'username': self.username, 'password': self.password})
+        return response.status_code == 302
+
+    def twin(self):
+        """Second client on the same session, for concurrent double submits."""
+        twin = InProcessAgent(self.username, self.password)
+        # A copy of the cookies: each client then only sees the messages flashed to its own requests
+        twin.client.cookies = SimpleCookie({name: morsel.value for name, morsel in self.client.cookies.items()})
+        return twin
+
+    def post(self, action, idempotency_key):
+        # A browser reads the flashed messages on the redirect; dropping them here has the same effect
+        self.client.cookies.pop(CookieStorage.cookie_name, None)
+        try:
+            response = self.client.post('/tracker/', {'action': action, 'idempotency_key': idempotency_key})
+        except OperationalError as exc:
+            return LOCK_ERROR if is_lock_error(exc) else SERVER_ERROR
+        except Exception:
+            return SERVER_ERROR
+        if response.status_code != 302:
+            return f'http_{response.status_code}'
+        return flash_outcome(response.wsgi_request)
+
+
+def flash_outcome(request):
+    """
+    Outcome of a tracker POST from the level of the messages it flashed.
+
+    The agents drop the messages cookie before each POST, so the request's
+    messages are only the ones it flashed itself.
+    """
+    levels = {message.level for message in messages.get_messages(request)}
+    if messages.ERROR in levels:
+        return REFUSED
+    if messages.INFO in levels:
+        return DEDUPLICATED
+    return OK
+
+
+class _NoRedirect(HTTPRedirectHandler):
+    """Report the tracker's 302 instead of following it, as the test client does."""
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+class HttpAgent:
+    """
+    A simulated agent with its own session cookie against a running server (runserver, gunicorn...).
+
+    The server's flash messages are signed with its own SECRET_KEY, so every 302
+    counts as OK here: refusals only show as missing actions.
+    """
+
+    def __init__(self, base_url, username, password, cookies=None):
+        self.base_url = base_url.rstrip('/')
+        self.username = username
+        self.password = password
+        self.cookies = cookies if cookies is not None else CookieJar()
+        self.opener = build_opener(HTTPCookieProcessor(self.cookies), _NoRedirect)
+
+    def csrf_token(self):
+        return next((cookie.value for cookie in self.cookies if cookie.name == 'csrftoken'), '')
+
+    def send(self, path, data=None):
+        """Status code of a GET, or of a form POST carrying the CSRF token."""
+        body = None
+        headers = {}
+        if data is not None:
+            token = self.csrf_token()
+            body = urlencode({**data, 'csrfmiddlewaretoken': token}).encode()
+            headers = {'X-CSRFToken': token, 'Referer': self.base_url + path}
+        try:
+            with self.opener.open(Request(self.base_url + path, data=body, headers=headers), timeout=60) as response:
+                response.read()
+                return response.status
+        except HTTPError as error:
+            return error.code
+
+    def login(self):
+        if self.send('/') != 200:
+            return False
+        return self.send('/', {'username': self.username, 'password': self.password}) == 302
+
+    def twin(self):
+        return HttpAgent(self.base_url, self.username, self.password, cookies=self.cookies)
+
+    def post(self, action, idempotency_key):
+        try:
+            status = self.send('/tracker/', {'action': action, 'idempotency_key': idempotency_key})
+        except (URLError, OSError):
+            return 'connection_error'
+        if status == 302:
+            return OK
+        return SERVER_ERROR if status >= 500 else f'http_{status}'
+
+
+def closing_connections(function, *args):
+    """Run function in a worker thread, then close the database connections the thread opened."""
+    try:
+        return function(*args)
+    finally:
+        connections.close_all()
+
+
+def timed_post(agent, action, idempotency_key):
+    started = time_module.perf_counter()
+    outcome = agent.post(action, idempotency_key)
+    return time_module.perf_counter() - started, outcome
+
+
+def submit_action(agent, action, double_submit):
+    """
+    Send one tracker action; with double_submit, the same form twice at once (a double click).
+
+    Returns a list of (seconds, outcome), one per request sent.
+    """
+    idempotency_key = uuid.uuid4().hex
+    if not double_submit:
+        return [timed_post(agent, action, idempotency_key)]
+
+    twin = agent.twin()
+    start_line = threading.Barrier(2)
+    results = [None, None]
+
+    def send(index, sender):
+        start_line.wait()
+        results[index] = timed_post(sender, action, idempotency_key)
+
+    twin_thread = threading.Thread(target=closing_connections, args=(send, 1, twin))
+    twin_thread.start()
+    send(0, agent)
+    twin_thread.join()
+    return results
+
+
+def run_shift(agents, threads, double_submit_rate=0.0, hold_seconds=0.0, rng=None, progress=None):
+    """
+    Replay SHIFT_SEQUENCE for every agent, one step at a time across a thread pool.
+
+    Each step is a storm: all agents send it at once, the way the whole floor
+    clocks in at 22:00. Between a break's start and end the run waits
+    hold_seconds, so break minutes are not all zero. Returns
+    ({step: [(seconds, outcome)]}, wall seconds spent sending).
+    """
+    results = {}
+    wall_seconds = 0.0
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        for step in SHIFT_SEQUENCE:
+            doubles = [bool(rng and rng.random() < double_submit_rate) for _ in agents]
+            started = time_module.perf_counter()
+            futures = [
+                pool.submit(closing_connections, submit_action, agent, step, double)
+                for agent, double in zip(agents, doubles)
+            ]
+            results[step] = [result for future in futures for result in future.result()]
+            elapsed = time_module.perf_counter() - started
+            wall_seconds += elapsed
+            if progress:
+                progress(step, results[step], elapsed)
+            if step.startswith('start_') and hold_seconds:
+                time_module.sleep(hold_seconds)
+    return results, wall_seconds
+
+
+@contextmanager
+def scratch_sqlite_database(copy_current=False, options=None):
+    """
+    Point the default SQLite database at a scratch file in a temporary directory.
+
+    The file is a backup copy of the current database with copy_current, else a
+    freshly migrated one; options replaces the connection OPTIONS meanwhile.
+    Yields the scratch path. NAME and OPTIONS are restored afterwards and the
+    connection closed, so the next query reconnects to the real database.
+    """
+    db_settings = connections.settings['default']
+    original = {'NAME': db_settings['NAME'], 'OPTIONS': db_settings.get('OPTIONS', {})}
+    with tempfile.TemporaryDirectory() as scratch:
+        scratch_name = os.path.join(scratch, 'scratch.sqlite3')
+        if copy_current:
+            connection.ensure_connection()
+            target = sqlite3.connect(scratch_name)
+            try:
+                connection.connection.backup(target)
+            finally:
+                target.close()
+        connection.close()
+        db_settings['NAME'] = scratch_name
+        if options is not None:
+            db_settings['OPTIONS'] = options
+        try:
+            if not copy_current:
+                call_command('migrate', verbosity=0)
+            yield scratch_name
+        finally:
+            connection.close()
+            db_settings.update(original)
+
+
+def latency_summary(seconds):
+    """Count and p50/p95/p99/max latency in milliseconds."""
+    if not seconds:
+        return {'count': 0}
+    milliseconds = sorted(value * 1000 for value in seconds)
+    summary = {'count': len(milliseconds), 'p50': statistics.median(milliseconds), 'max': milliseconds[-1]}
+    if len(milliseconds) >= 2:
+        cut_points = statistics.quantiles(milliseconds, n=100, method='inclusive')
+        summary.update(p95=cut_points[94], p99=cut_points[98])
+    return summary
+
+
+def shift_violations(user_ids):
+    """
+    Check what the agents' shift left in the database.
+
+    Returns (violations, missing): violations are states no sequence of
+    requests may produce: an action recorded twice, allocation minutes that
+    differ from the tracker's duration notes or from the start and end log
+    timestamps (double counting), or an interval or presence left open.
+    missing counts actions never recorded, which failed requests explain.
+    """
+    violations = []
+    missing = Counter()
+
+    recorded = defaultdict(Counter)
+    noted_minutes = defaultdict(Counter)
+    # user id -> action -> timestamp of its first log
+    timestamps = defaultdict(dict)
+    logs = AttendanceLog.objects.filter(user_id__in=user_ids).order_by('timestamp', 'id')
+    for user_id, action, note, timestamp in logs.values_list('user_id', 'action', 'note', 'timestamp'):
+        recorded[user_id][action] += 1
+        timestamps[user_id].setdefault(action, timestamp)
+        match = DURATION_NOTE.search(note or '')
+        if action.startswith('end_') and match:
+            noted_minutes[user_id][action[len('end_'):]] += int(match.group(1))
+
+    for user_id in user_ids:
+        for action in SHIFT_SEQUENCE:
+            count = recorded[user_id][action]
+            if count > 1:
+                violations.append(f'user {user_id}: {action} recorded {count} times')
+            elif count == 0:
+                missing[action] += 1
+
+    allocations = DailyTimeAllocation.objects.filter(user_id__in=user_ids)
+    for allocation in allocations:
+        for kind, (start_field, minutes_field, _) in INTERVALS.items():
+            used = getattr(allocation, minutes_field)
+            if used != noted_minutes[allocation.user_id][kind]:
+                violations.append(
+                    f'user {allocation.user_id}: {minutes_field}={used} but notes add up to '
+                    f'{noted_minutes[allocation.user_id][kind]}'
+                )
+            started = timestamps[allocation.user_id].get(f'start_{kind}')
+            ended = timestamps[allocation.user_id].get(f'end_{kind}')
+            if started and ended:
+                seconds = (ended - started).total_seconds()
+                if not used * 60 - TIMESTAMP_SLACK_SECONDS <= seconds < (used + 1) * 60 + TIMESTAMP_SLACK_SECONDS:
+                    violations.append(
+                        f'user {allocation.user_id}: {minutes_field}={used} but its logs are {seconds:.0f} s apart'
+                    )
+            if getattr(allocation, start_field) is not None and recorded[allocation.user_id][f'end_{kind}']:
+                violations.append(f'user {allocation.user_id}: {kind} ended but still open')
+
+    clocked_out = {user_id for user_id in user_ids if recorded[user_id]['clock_out'] >= recorded[user_id]['clock_in']}
+    still_present = UserPresence.objects.filter(user_id__in=clocked_out).exclude(state=UserPresence.IDLE)
+    for user_id, state in still_present.values_list('user_id', 'state'):
+        violations.append(f'user {user_id}: clocked out but presence is {state}')
+
+    return violations, missing
@@ -0,0 +1,38 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from attendance_app.archive import ARCHIVE_CHUNK_SIZE, archive_cutoff, archive_logs
+from attendance_app.models import AttendanceLog
+
+
+class Command(BaseCommand):
+    help = 'Moves AttendanceLog rows of whole months past the retention period into the archive table, in chunked transactions'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--months', type=int, default=settings.ATTENDANCE_LOG_RETENTION_MONTHS,
+            help='Months of logs kept in the hot table besides the current one',
+        )
+        parser.add_argument('--chunk-size', type=int, default=ARCHIVE_CHUNK_SIZE, help='Rows moved per transaction')
+        parser.add_argument('--dry-run', action='store_true', help='Only count the rows that would move')
+
+    def handle(self, *args, **options):
+        if options['months'] < 1:
+            raise CommandError('--months must be at least 1.')
+
+        cutoff = archive_cutoff(options['months'])
+        if options['dry_run']:
+            count = AttendanceLog.objects.filter(shift_date__lt=cutoff).count()
+            self.stdout.write(f'{count} log(s) of shifts before {cutoff} would be archived.')
+            return
+
+        started = time.perf_counter()
+
+        def progress(moved):
+            self.stdout.write(f'moved {moved} log(s)')
+
+        moved = archive_logs(cutoff, chunk_size=options['chunk_size'], progress=progress)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f'Archived {moved} log(s) of shifts before {cutoff} in {elapsed:.2f}s.'))
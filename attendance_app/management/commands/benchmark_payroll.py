@@ -0,0 +1,113 @@
+import time as time_module
+from datetime import date, datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from attendance_app.models import get_shift_date
+from attendance_app.payroll import ACTION_CODES, aggregate_payroll, load_month_events, month_bounds, require_numpy
+from attendance_app.summaries import SHIFT_START_TIME, summarize_shift
+
+# Actions of one synthetic shift, in order
+SHIFT_ACTIONS = [
+    'clock_in', 'start_break1', 'end_break1', 'start_lunch',
+    'end_lunch', 'start_break2', 'end_break2', 'clock_out',
+]
+# Rough minutes after 22:00 of each action, jittered per shift
+SHIFT_OFFSETS = [0, 120, 135, 240, 300, 420, 435, 540]
+
+# The per-event Python loop is only timed up to this many events
+LOOP_LIMIT = 1000000
+
+
+class Command(BaseCommand):
+    help = (
+        'Times the payroll report of a month from the database (load and aggregation), then the vectorized '
+        'aggregation on synthetic in-memory events against a per-event Python loop'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', default='100000,1000000,10000000',
+            help='Comma separated event counts to benchmark',
+        )
+        parser.add_argument('--days', type=int, default=30, help='Shift days the events spread over')
+        parser.add_argument('--month', help='YYYY-MM month of real logs to load and aggregate (defaults to the current one)')
+
+    def handle(self, *args, **options):
+        require_numpy()
+        sizes = sorted(int(size) for size in options['sizes'].split(','))
+
+        self._benchmark_month(options['month'] or get_shift_date(timezone.now()).strftime('%Y-%m'))
+
+        for size in sizes:
+            events = self._synthetic_events(size, options['days'])
+
+            started = time_module.perf_counter()
+            totals = aggregate_payroll(*events)
+            vectorized_s = time_module.perf_counter() - started
+
+            line = f'{size:>9} events, {len(totals["user_id"]):>6} agents: vectorized {vectorized_s:7.2f} s'
+            if size <= LOOP_LIMIT:
+                started = time_module.perf_counter()
+                self._python_loop(*events)
+                line += f', python loop {time_module.perf_counter() - started:7.2f} s'
+            self.stdout.write(line)
+
+        self.stdout.write(self.style.SUCCESS('Benchmark finished.'))
+
+    def _benchmark_month(self, month):
+        """Time the report's two stages on real logs: the database load dominates unless it is measured too."""
+        try:
+            first, last = month_bounds(month)
+        except ValueError:
+            raise CommandError('Invalid month, expected YYYY-MM.')
+
+        started = time_module.perf_counter()
+        events = load_month_events(first, last)
+        load_s = time_module.perf_counter() - started
+
+        started = time_module.perf_counter()
+        totals = aggregate_payroll(*events)
+        aggregate_s = time_module.perf_counter() - started
+
+        self.stdout.write(
+            f'{month}: {len(events[0]):>9} events, {len(totals["user_id"]):>6} agents: '
+            f'load {load_s:7.2f} s, aggregate {aggregate_s:7.2f} s, total {load_s + aggregate_s:7.2f} s'
+        )
+
+    def _synthetic_events(self, size, days):
+        """Columnar events for complete shifts of size // 8 (agent, day) pairs."""
+        import numpy as np
+
+        rng = np.random.default_rng(0)
+        shifts = max(size // len(SHIFT_ACTIONS), 1)
+        first_day = date(2025, 1, 1).toordinal()
+        shift_start = timezone.make_aware(datetime.combine(date.fromordinal(first_day), SHIFT_START_TIME)).timestamp()
+
+        shift_index = np.arange(shifts)
+        user_ids = np.repeat(shift_index // days + 1, len(SHIFT_ACTIONS))
+        day_offsets = np.repeat(shift_index % days, len(SHIFT_ACTIONS))
+        action_codes = np.tile(np.array([ACTION_CODES[action] for action in SHIFT_ACTIONS], dtype=np.int8), shifts)
+
+        minutes = np.tile(np.array(SHIFT_OFFSETS, dtype=np.float64), shifts)
+        minutes += rng.integers(0, 12, size=minutes.size)
+        timestamps = shift_start + day_offsets * 86400 + minutes * 60
+
+        # Shuffle so the aggregation has to do the sorting
+        order = rng.permutation(user_ids.size)
+        return user_ids[order], (first_day + day_offsets)[order], action_codes[order], timestamps[order]
+
+    def _python_loop(self, user_ids, shift_days, action_codes, timestamps):
+        """The same work done one event at a time, as summaries.summarize_shift does."""
+        actions = {code: action for action, code in ACTION_CODES.items()}
+        by_shift = {}
+        for user_id, day, code, timestamp in zip(user_ids.tolist(), shift_days.tolist(), action_codes.tolist(), timestamps.tolist()):
+            by_shift.setdefault((user_id, day), []).append((timestamp, actions[code]))
+
+        for (user_id, day), events in by_shift.items():
+            events.sort()
+            summarize_shift(user_id, date.fromordinal(day), [
+                (action, datetime.fromtimestamp(timestamp, tz=timezone.get_current_timezone()))
+                for timestamp, action in events
+            ])
@@ -0,0 +1,73 @@
+import time as time_module
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from attendance_app.models import AttendanceLog, DailyTimeAllocation, UserPresence, get_shift_date
+from attendance_app.roster import compute_roster, compute_roster_from_logs
+
+
+class Command(BaseCommand):
+    help = 'Measures query count and latency of the admin roster as the number of users grows (changes are rolled back)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', default='10,100,1000,2000',
+            help='Comma separated user counts to benchmark',
+        )
+
+    def handle(self, *args, **options):
+        sizes = sorted(int(size) for size in options['sizes'].split(','))
+        today = get_shift_date(timezone.now())
+
+        with transaction.atomic():
+            created = 0
+            for size in sizes:
+                created = self._grow_workforce(created, size, today)
+
+                for label, roster in (('presence', compute_roster), ('log scan', lambda: compute_roster_from_logs(today))):
+                    with CaptureQueriesContext(connection) as queries:
+                        started = time_module.perf_counter()
+                        clocked_in, on_break, at_lunch = roster()
+                        elapsed_ms = (time_module.perf_counter() - started) * 1000
+
+                    self.stdout.write(
+                        f'{size:>6} users [{label:>8}]: {len(queries):>2} queries, {elapsed_ms:8.1f} ms '
+                        f'(clocked in={len(clocked_in)}, break={len(on_break)}, lunch={len(at_lunch)})'
+                    )
+
+            # Never keep the synthetic users
+            transaction.set_rollback(True)
+
+        self.stdout.write(self.style.SUCCESS('Benchmark finished, synthetic data rolled back.'))
+
+    def _grow_workforce(self, existing, target, today):
+        """Create synthetic users up to target, clocking in every other one."""
+        now = timezone.now()
+        new_users = User.objects.bulk_create([
+            User(username=f'bench_roster_{index}') for index in range(existing, target)
+        ])
+
+        logs = []
+        allocations = []
+        presences = []
+        for index, user in enumerate(new_users, start=existing):
+            if index % 2:
+                continue
+            logs.append(AttendanceLog(user=user, action='clock_in', shift_date=today))
+            state = UserPresence.WORKING
+            if index % 3 == 0:
+                allocations.append(DailyTimeAllocation(user=user, date=today, break1_start_time=now))
+                state = UserPresence.ON_BREAK1
+            elif index % 5 == 0:
+                allocations.append(DailyTimeAllocation(user=user, date=today, lunch_start_time=now))
+                state = UserPresence.AT_LUNCH
+            presences.append(UserPresence(user=user, state=state, state_since=now, shift_date=today))
+
+        AttendanceLog.objects.bulk_create(logs)
+        DailyTimeAllocation.objects.bulk_create(allocations)
+        UserPresence.objects.bulk_create(presences)
+        return target
@@ -0,0 +1,186 @@
+import json
+import platform
+import statistics
+import subprocess
+import time as time_module
+import uuid
+from contextlib import contextmanager
+
+import django
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections, transaction
+from django.db.models import Count
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from attendance_app.loadtest import scratch_sqlite_database
+from attendance_app.models import AttendanceLog
+
+# Page sizes the admin dashboard offers
+ADMIN_PAGE_SIZES = [5, 10, 25, 50]
+
+
+class Command(BaseCommand):
+    help = (
+        'Measures latency and query counts of the tracker, dashboards and exports through the test client '
+        'and writes the results as JSON for comparing runs (read scenarios are rolled back; tracker POSTs '
+        'commit, on a scratch copy of a SQLite database or as a throwaway agent elsewhere)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20, help='Requests per scenario')
+        parser.add_argument('--agent', help='Username of the agent to benchmark (defaults to the one with the most logs)')
+        parser.add_argument('--output', help='JSON file to write (defaults to stdout)')
+        parser.add_argument('--skip-exports', action='store_true', help='Leave out the export endpoints')
+
+    def handle(self, *args, **options):
+        agent = self._agent(options['agent'])
+        admin = User.objects.filter(is_superuser=True).first()
+        if admin is None:
+            raise CommandError('A superuser is needed for the admin scenarios.')
+
+        agent_client = Client()
+        agent_client.force_login(agent)
+        admin_client = Client()
+        admin_client.force_login(admin)
+
+        scenarios = [
+            ('tracker GET', agent_client, 'get', '/tracker/', {}),
+            ('tracker POST clock_in/clock_out', agent_client, 'post', '/tracker/', None),
+            ('dashboard', agent_client, 'get', '/dashboard/', {}),
+        ]
+        scenarios += [
+            (f'admin_dashboard size={size}', admin_client, 'get', '/admin-dashboard/', {'size': size})
+            for size in ADMIN_PAGE_SIZES
+        ]
+        if not options['skip_exports']:
+            scenarios += [
+                ('export_csv xlsx', agent_client, 'get', '/export-csv/', {}),
+                ('export_csv csv', agent_client, 'get', '/export-csv/', {'format': 'csv'}),
+                ('admin_export_csv xlsx (agent)', admin_client, 'get', '/admin-export-csv/', {'user': agent.id}),
+                ('admin_export_csv csv', admin_client, 'get', '/admin-export-csv/', {'format': 'csv'}),
+            ]
+
+        results = []
+        with override_settings(ALLOWED_HOSTS=['testserver']):
+            for name, client, method, url, data in scenarios:
+                self.stderr.write(f'{name}...')
+                if data is None:
+                    with self._committing_agent(agent) as writer:
+                        results.append(self._measure(name, writer, method, url, data, options['iterations']))
+                else:
+                    with transaction.atomic():
+                        results.append(self._measure(name, client, method, url, data, options['iterations']))
+                        transaction.set_rollback(True)
+
+        report = {
+            'generated_at': timezone.now().isoformat(),
+            'commit': self._commit(),
+            'environment': {
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+            },
+            'dataset': {
+                'users': User.objects.count(),
+                'logs': AttendanceLog.objects.count(),
+                'agent': agent.username,
+                'agent_logs': AttendanceLog.objects.filter(user=agent).count(),
+            },
+            'iterations': options['iterations'],
+            'scenarios': results,
+        }
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as handle:
+                handle.write(output + '\n')
+            self.stdout.write(self.style.SUCCESS(f'Wrote {len(results)} scenario(s) to {options["output"]}.'))
+        else:
+            self.stdout.write(output)
+
+    def _agent(self, username):
+        if username:
+            agent = User.objects.filter(username=username).first()
+            if agent is None:
+                raise CommandError(f'No user named {username!r}.')
+            return agent
+        busiest = (
+            AttendanceLog.objects.filter(user__is_superuser=False).values('user_id')
+            .order_by().annotate(count=Count('id')).order_by('-count').first()
+        )
+        if busiest is None:
+            raise CommandError('No agent logs to benchmark; run generate_workforce first.')
+        return User.objects.get(id=busiest['user_id'])
+
+    def _measure(self, name, client, method, url, data, iterations):
+        """Latency percentiles, query counts and response size of one scenario."""
+        latencies = []
+        query_counts = []
+        sizes = []
+        statuses = set()
+
+        for iteration in range(iterations):
+            # Tracker POSTs alternate clock in and out
+            payload = data if data is not None else {'action': ('clock_in', 'clock_out')[iteration % 2]}
+            with CaptureQueriesContext(connection) as queries:
+                started = time_module.perf_counter()
+                response = getattr(client, method)(url, payload)
+                body = b''.join(response.streaming_content) if response.streaming else response.content
+                latencies.append((time_module.perf_counter() - started) * 1000)
+            query_counts.append(len(queries))
+            sizes.append(len(body))
+            statuses.add(response.status_code)
+
+        result = {
+            'name': name,
+            'method': method.upper(),
+            'url': url,
+            'params': data or {},
+            'status_codes': sorted(statuses),
+            'queries': {'min': min(query_counts), 'max': max(query_counts), 'mean': round(statistics.mean(query_counts), 2)},
+            'latency_ms': {
+                'mean': round(statistics.mean(latencies), 2),
+                'p50': round(statistics.median(latencies), 2),
+                'max': round(max(latencies), 2),
+            },
+            'response_bytes': {'mean': round(statistics.mean(sizes))},
+        }
+        if len(latencies) >= 2:
+            cut_points = statistics.quantiles(latencies, n=20, method='inclusive')
+            result['latency_ms']['p95'] = round(cut_points[18], 2)
+        return result
+
+    @contextmanager
+    def _committing_agent(self, agent):
+        """
+        Client whose tracker POSTs really commit (fsync, on_commit hooks), leaving no trace.
+
+        On SQLite it is the agent itself on a scratch copy of the database, thrown
+        away afterwards. Other backends get a throwaway agent, deleted with its logs.
+        """
+        db_settings = connections.settings['default']
+        client = Client()
+        if db_settings['ENGINE'] != 'django.db.backends.sqlite3':
+            writer = User.objects.create_user(f'benchmark_writer_{uuid.uuid4().hex[:8]}')
+            client.force_login(writer)
+            try:
+                yield client
+            finally:
+                client.logout()
+                writer.delete()
+            return
+
+        with scratch_sqlite_database(copy_current=True):
+            client.force_login(agent)
+            yield client
+
+    def _commit(self):
+        """Current git commit, or None outside a checkout."""
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
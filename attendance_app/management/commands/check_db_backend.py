@@ -0,0 +1,67 @@
+import csv
+import io
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from attendance_app.exports import SUMMARY_HEADERS, iter_activity_rows, stream_text_export
+from attendance_app.models import AttendanceLog, get_shift_date
+from attendance_app.postgres import is_postgresql, stream_copy_csv
+from attendance_app.roster import clocked_in_by_latest_action, clocked_in_by_no_later_action
+
+# Index created by migration 0011 on PostgreSQL only
+BRIN_INDEX_NAME = 'attlog_timestamp_brin'
+
+
+class Command(BaseCommand):
+    help = (
+        'Reports the configured database backend and checks every PostgreSQL fast path '
+        '(BRIN index, DISTINCT ON roster, COPY export) against its portable fallback'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, help='User id whose export is compared (defaults to every user)')
+
+    def handle(self, *args, **options):
+        settings_dict = connection.settings_dict
+        self.stdout.write(
+            f'{connection.vendor} ({settings_dict["ENGINE"]}), CONN_MAX_AGE={settings_dict["CONN_MAX_AGE"]}, '
+            f'CONN_HEALTH_CHECKS={settings_dict["CONN_HEALTH_CHECKS"]}'
+        )
+        if not is_postgresql():
+            self.stdout.write('PostgreSQL fast paths inactive; the portable queries are in use.')
+            return
+
+        mismatches = []
+        with connection.cursor() as cursor:
+            indexes = connection.introspection.get_constraints(cursor, AttendanceLog._meta.db_table)
+        if BRIN_INDEX_NAME in indexes:
+            self.stdout.write(self.style.SUCCESS(f'{BRIN_INDEX_NAME} present'))
+        else:
+            mismatches.append(f'{BRIN_INDEX_NAME} missing (run migrate)')
+
+        shift_date = get_shift_date(timezone.now())
+        if clocked_in_by_latest_action(shift_date) == clocked_in_by_no_later_action(shift_date):
+            self.stdout.write(self.style.SUCCESS('DISTINCT ON roster matches the portable roster'))
+        else:
+            mismatches.append('DISTINCT ON roster differs from the portable roster')
+
+        logs = AttendanceLog.objects.all()
+        if options['user']:
+            logs = logs.filter(user_id=options['user'])
+        logs = logs.order_by('user__username', 'user_id', '-timestamp', 'id')
+        copied = self._parse(stream_copy_csv(logs, SUMMARY_HEADERS, include_username=True))
+        streamed = self._parse(stream_text_export(iter_activity_rows(logs, include_username=True), SUMMARY_HEADERS, 'csv'))
+        if copied == streamed:
+            self.stdout.write(self.style.SUCCESS(f'COPY export matches the streamed csv ({len(copied) - 1} rows)'))
+        else:
+            mismatches.append('COPY export differs from the streamed csv')
+
+        if mismatches:
+            raise CommandError('; '.join(mismatches))
+
+    def _parse(self, lines):
+        """Rows of a csv export, whatever its line endings or str/bytes chunks."""
+        text = ''.join(line.decode() if isinstance(line, bytes) else line for line in lines)
+        return list(csv.reader(io.StringIO(text)))
@@ -0,0 +1,39 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from attendance_app.models import get_shift_date
+from attendance_app.query_plans import hot_log_queries, indexes_used
+
+
+class Command(BaseCommand):
+    help = 'Prints EXPLAIN plans for the hot AttendanceLog queries of tracker_view, admin_dashboard and dashboard and checks they use an index'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, help='User id to build the queries for (defaults to the first user)')
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(id=options['user']).first() if options['user'] else User.objects.first()
+        if user is None:
+            raise CommandError('No user to build the queries for.')
+
+        shift_date = get_shift_date(timezone.now())
+
+        queries = hot_log_queries(user, shift_date)
+
+        missing = []
+        for label, queryset in queries.items():
+            plan = queryset.explain()
+            used = indexes_used(plan)
+
+            self.stdout.write(self.style.MIGRATE_HEADING(label))
+            self.stdout.write(plan)
+            if used:
+                self.stdout.write(self.style.SUCCESS(f'uses {", ".join(used)}'))
+            else:
+                self.stdout.write(self.style.ERROR('no AttendanceLog composite index used'))
+                missing.append(label)
+            self.stdout.write('')
+
+        if missing:
+            raise CommandError(f'{len(missing)} query plan(s) without an index: {", ".join(missing)}')
@@ -0,0 +1,48 @@
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from attendance_app.models import get_shift_date
+from attendance_app.summaries import rebuild_summaries
+from attendance_app.synthetic import generate_workforce
+
+
+class Command(BaseCommand):
+    help = (
+        'Generates synthetic agents with months of night-shift clock, break and lunch events and matching '
+        'time allocations, for reproducing production load locally'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100, help='Agents to create')
+        parser.add_argument('--months', type=int, default=3, help='Months (30 days each) of shifts per agent')
+        parser.add_argument('--end', type=date.fromisoformat, help='Last shift date (YYYY-MM-DD), defaults to the previous shift')
+        parser.add_argument('--prefix', default='synth_agent_', help='Username prefix of the generated agents')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed, for reproducible data sets')
+        parser.add_argument('--skip-summaries', action='store_true', help='Do not rebuild the daily summaries afterwards')
+
+    def handle(self, *args, **options):
+        if options['users'] < 1 or options['months'] < 1:
+            raise CommandError('--users and --months must be at least 1.')
+
+        end = options['end'] or get_shift_date(timezone.now()) - timedelta(days=1)
+        start = end - timedelta(days=30 * options['months'] - 1)
+        self.stdout.write(f'Generating {options["users"]} agent(s) with shifts from {start} to {end}...')
+        started = time.perf_counter()
+
+        def progress(users_done, logs_written):
+            self.stdout.write(f'{users_done} agent(s), {logs_written} log(s)')
+
+        users, logs = generate_workforce(
+            options['users'], start, end, prefix=options['prefix'], seed=options['seed'], progress=progress,
+        )
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f'Wrote {logs} log(s) in {elapsed:.2f}s ({logs / elapsed if elapsed else 0:,.0f} rows/s).')
+
+        if not options['skip_summaries']:
+            summaries = rebuild_summaries(start, end)
+            self.stdout.write(f'Rebuilt {summaries} summary row(s).')
+
+        self.stdout.write(self.style.SUCCESS(f'Generated {users} agent(s) named {options["prefix"]}N.'))
@@ -0,0 +1,50 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from attendance_app.imports import IMPORT_CHUNK_SIZE, BadgeImport, read_badge_rows
+
+
+class Command(BaseCommand):
+    help = (
+        'Imports historical badge-reader events (csv with a header line, or jsonl) into AttendanceLog, '
+        'adding break and lunch minutes to DailyTimeAllocation in the same pass'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='csv or jsonl file with username, timestamp, action and optional note')
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help='Input format (defaults to the file extension)')
+        parser.add_argument('--start-offset', type=int, default=0, help='Data rows to skip, to resume an interrupted import')
+        parser.add_argument('--chunk-size', type=int, default=IMPORT_CHUNK_SIZE, help='Rows committed per transaction')
+        parser.add_argument('--create-users', action='store_true', help='Create accounts for unknown usernames instead of rejecting their rows')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        input_format = options['format'] or ('jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv')
+        if options['start_offset'] < 0 or options['chunk_size'] < 1:
+            raise CommandError('--start-offset must be >= 0 and --chunk-size >= 1.')
+
+        badge_import = BadgeImport(create_users=options['create_users'], chunk_size=options['chunk_size'])
+        started = time.perf_counter()
+
+        def progress(offset):
+            elapsed = time.perf_counter() - started
+            rate = (offset - options['start_offset']) / elapsed if elapsed else 0
+            self.stdout.write(f'committed through row {offset} ({badge_import.imported} imported, {rate:,.0f} rows/s)')
+
+        try:
+            with open(path, newline='', encoding='utf-8') as stream:
+                offset = badge_import.run(read_badge_rows(stream, input_format), options['start_offset'], progress)
+        except OSError as error:
+            raise CommandError(f'Cannot read {path}: {error}')
+        except ValueError as error:
+            raise CommandError(f'Malformed {input_format} input: {error}. Resume with --start-offset from the last committed row.')
+
+        elapsed = time.perf_counter() - started
+        read = offset - options['start_offset']
+        for reason, count in sorted(badge_import.rejected.items()):
+            self.stdout.write(self.style.WARNING(f'rejected {count} row(s): {reason}'))
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {badge_import.imported} of {read} row(s) in {elapsed:.2f}s ({read / elapsed if elapsed else 0:,.0f} rows/s). '
+            'Run rebuild_summaries for the imported shift dates.'
+        ))
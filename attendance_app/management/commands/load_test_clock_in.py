@@ -0,0 +1,88 @@
+import logging
+import statistics
+import threading
+import time as time_module
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client, override_settings
+
+from attendance_app.loadtest import closing_connections, scratch_sqlite_database
+
+
+class Command(BaseCommand):
+    help = (
+        'Load test: N agents clock in through tracker_view at the same moment from concurrent threads, '
+        'on a scratch SQLite database, once with default SQLite settings and once with the tuned ones'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--agents', type=int, default=200, help='Agents clocking in at once')
+        parser.add_argument('--threads', type=int, default=32, help='Concurrent client threads')
+
+    def handle(self, *args, **options):
+        db_settings = connections.settings['default']
+        if db_settings['ENGINE'] != 'django.db.backends.sqlite3':
+            raise CommandError('This load test targets the SQLite backend.')
+
+        # Failed requests are counted, not logged one traceback at a time
+        request_logger = logging.getLogger('django.request')
+        previous_level = request_logger.level
+        request_logger.setLevel(logging.CRITICAL)
+
+        try:
+            for label, tuned in (('default', False), ('tuned', True)):
+                # Pragmas are overridden first: the scratch database is migrated with them
+                with override_settings(
+                    ALLOWED_HOSTS=['testserver'],
+                    SQLITE_PRAGMAS=settings.SQLITE_PRAGMAS if tuned else {},
+                    SQLITE_LOCK_RETRIES=settings.SQLITE_LOCK_RETRIES if tuned else 0,
+                ), scratch_sqlite_database(options=None if tuned else {}):
+                    self._report(label, self._run(options['agents'], options['threads']))
+        finally:
+            request_logger.setLevel(previous_level)
+
+        self.stdout.write(self.style.SUCCESS('Load test finished, scratch databases removed.'))
+
+    def _run(self, agent_count, thread_count):
+        """Clock every agent in at once; returns (elapsed seconds, latencies of successes, failures)."""
+        agents = User.objects.bulk_create([User(username=f'load_agent_{index}') for index in range(agent_count)])
+        batches = [agents[index::thread_count] for index in range(thread_count)]
+        start_line = threading.Barrier(len(batches) + 1)
+        latencies = []
+        failures = []
+        lock = threading.Lock()
+
+        def worker(batch):
+            clients = []
+            for agent in batch:
+                client = Client(raise_request_exception=False)
+                client.force_login(agent)
+                clients.append(client)
+            start_line.wait()
+
+            for client in clients:
+                started = time_module.perf_counter()
+                response = client.post('/tracker/', {'action': 'clock_in'})
+                elapsed = time_module.perf_counter() - started
+                with lock:
+                    (latencies if response.status_code == 302 else failures).append(elapsed)
+
+        threads = [threading.Thread(target=closing_connections, args=(worker, batch)) for batch in batches]
+        for thread in threads:
+            thread.start()
+        start_line.wait()
+        started = time_module.perf_counter()
+        for thread in threads:
+            thread.join()
+        return time_module.perf_counter() - started, latencies, failures
+
+    def _report(self, label, result):
+        elapsed, latencies, failures = result
+        line = f'{label:>8}: {len(latencies)} clock-ins in {elapsed:6.2f} s ({len(latencies) / elapsed:6.1f}/s), {len(failures)} failed'
+        if len(latencies) >= 2:
+            cut_points = statistics.quantiles(latencies, n=20)
+            line += f', p50 {statistics.median(latencies) * 1000:6.0f} ms, p95 {cut_points[18] * 1000:6.0f} ms'
+        self.stdout.write(line)
@@ -0,0 +1,136 @@
+import logging
+import random
+from collections import Counter
+from contextlib import ExitStack
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import override_settings
+
+from attendance_app.loadtest import (
+    EXPECTED_OUTCOMES, LOCK_ERROR, SHIFT_SEQUENCE, HttpAgent, InProcessAgent, latency_summary, run_shift,
+    scratch_sqlite_database, shift_violations,
+)
+
+# Cheap hashing for the in-process run, so hundreds of logins measure the tracker and not PBKDF2
+FAST_PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+
+class Command(BaseCommand):
+    help = (
+        'Load test: simulated agents log in and replay a whole night shift (clock in, break 1, lunch, break 2, '
+        'clock out) step by step at once, in-process on a scratch SQLite database or against a running server; '
+        'reports throughput, latency percentiles, lock errors and correctness violations'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--agents', type=int, default=200, help='Simulated agents')
+        parser.add_argument('--threads', type=int, default=32, help='Concurrent requests')
+        parser.add_argument(
+            '--url', help='Base URL of a running server sharing this database (e.g. http://127.0.0.1:8000); '
+                          'defaults to the WSGI app in-process',
+        )
+        parser.add_argument('--double-submit-rate', type=float, default=0.1, help='Share of actions sent twice at once, like a double click')
+        parser.add_argument(
+            '--hold-seconds', type=float, default=65.0,
+            help='Wait between the start and end of each break and lunch; under 60 every interval lasts 0 minutes '
+                 'and double-counted minutes cannot show',
+        )
+        parser.add_argument('--password', default='load-test-password', help='Password of the simulated agents')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--keep', action='store_true', help='Keep the simulated agents in the database (--url only)')
+
+    def handle(self, *args, **options):
+        if options['agents'] < 1 or options['threads'] < 1:
+            raise CommandError('--agents and --threads must be at least 1.')
+
+        # Failed and over-budget requests are counted, not logged one at a time
+        quiet_loggers = [logging.getLogger(name) for name in ('django.request', 'attendance_app.instrumentation')]
+        previous_levels = [logger.level for logger in quiet_loggers]
+        for logger in quiet_loggers:
+            logger.setLevel(logging.CRITICAL)
+
+        try:
+            with ExitStack() as stack:
+                if not options['url']:
+                    stack.enter_context(self._scratch_database())
+                    stack.enter_context(override_settings(ALLOWED_HOSTS=['testserver'], PASSWORD_HASHERS=FAST_PASSWORD_HASHERS))
+                violations = self._run(options)
+        finally:
+            for logger, level in zip(quiet_loggers, previous_levels):
+                logger.setLevel(level)
+
+        if violations:
+            raise CommandError(f'{len(violations)} correctness violation(s).')
+        self.stdout.write(self.style.SUCCESS('Load test finished without correctness violations.'))
+
+    def _scratch_database(self):
+        """A migrated scratch SQLite database for the in-process run."""
+        if connections.settings['default']['ENGINE'] != 'django.db.backends.sqlite3':
+            raise CommandError('The in-process run uses a scratch SQLite database; use --url for other backends.')
+        return scratch_sqlite_database()
+
+    def _run(self, options):
+        prefix = 'load_shift_agent_'
+        password = make_password(options['password'])
+        users = User.objects.bulk_create([
+            User(username=f'{prefix}{index}', password=password) for index in range(options['agents'])
+        ])
+        user_ids = [user.id for user in users]
+
+        try:
+            if options['url']:
+                agents = [HttpAgent(options['url'], user.username, options['password']) for user in users]
+            else:
+                agents = [InProcessAgent(user.username, options['password']) for user in users]
+
+            self.stdout.write(f'Logging in {len(agents)} agent(s)...')
+            failed_logins = sum(not agent.login() for agent in agents)
+            if failed_logins:
+                raise CommandError(f'{failed_logins} agent(s) could not log in.')
+
+            def progress(step, results, elapsed):
+                outcomes = Counter(outcome for _, outcome in results)
+                latency = latency_summary([seconds for seconds, _ in results])
+                self.stdout.write(
+                    f'{step:>13}: {len(results):>5} requests in {elapsed:6.2f} s ({len(results) / elapsed:7.1f}/s), '
+                    f'p50 {latency["p50"]:6.0f} ms, p95 {latency.get("p95", latency["p50"]):6.0f} ms, '
+                    f'p99 {latency.get("p99", latency["p50"]):6.0f} ms, '
+                    f'{outcomes[LOCK_ERROR]} lock error(s), '
+                    f'{sum(count for outcome, count in outcomes.items() if outcome not in EXPECTED_OUTCOMES)} failed'
+                )
+
+            results, wall_seconds = run_shift(
+                agents, options['threads'],
+                double_submit_rate=options['double_submit_rate'],
+                hold_seconds=options['hold_seconds'],
+                rng=random.Random(options['seed']),
+                progress=progress,
+            )
+            connection.close()
+
+            all_results = [result for step in SHIFT_SEQUENCE for result in results[step]]
+            outcomes = Counter(outcome for _, outcome in all_results)
+            latency = latency_summary([seconds for seconds, _ in all_results])
+            self.stdout.write(
+                f'{"total":>13}: {len(all_results):>5} requests in {wall_seconds:6.2f} s '
+                f'({len(all_results) / wall_seconds:7.1f}/s), p50 {latency["p50"]:.0f} ms, '
+                f'p95 {latency.get("p95", latency["p50"]):.0f} ms, p99 {latency.get("p99", latency["p50"]):.0f} ms'
+            )
+            self.stdout.write('outcomes: ' + ', '.join(f'{outcome}={count}' for outcome, count in sorted(outcomes.items())))
+
+            violations, missing = shift_violations(user_ids)
+            if missing:
+                self.stdout.write(self.style.WARNING(
+                    'not recorded (failed requests): ' + ', '.join(f'{action}={count}' for action, count in missing.items())
+                ))
+            for violation in violations[:20]:
+                self.stdout.write(self.style.ERROR(violation))
+            if len(violations) > 20:
+                self.stdout.write(self.style.ERROR(f'... and {len(violations) - 20} more'))
+            return violations
+        finally:
+            if options['url'] and not options['keep']:
+                User.objects.filter(id__in=user_ids).delete()
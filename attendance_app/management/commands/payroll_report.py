@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from attendance_app.models import get_shift_date
+from attendance_app.payroll import month_bounds, payroll_rows, write_payroll_csv, write_payroll_workbook
+
+
+class Command(BaseCommand):
+    help = 'Writes the monthly payroll summary (worked hours, overtime, lateness, break overruns per agent) as XLSX or CSV'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--month', help='Month to report as YYYY-MM (defaults to the current shift month)')
+        parser.add_argument('--format', choices=['xlsx', 'csv'], default='xlsx')
+        parser.add_argument('--output', help='File to write (defaults to payroll_<Month>_<Year>.<format>)')
+
+    def handle(self, *args, **options):
+        month = options['month'] or get_shift_date(timezone.now()).strftime('%Y-%m')
+        try:
+            first, last = month_bounds(month)
+        except ValueError:
+            raise CommandError(f'Invalid month {month!r}, expected YYYY-MM.')
+
+        rows = payroll_rows(first)
+        output_path = options['output'] or f"payroll_{first.strftime('%B_%Y')}.{options['format']}"
+
+        if options['format'] == 'csv':
+            with open(output_path, 'w', newline='') as output:
+                write_payroll_csv(rows, output)
+        else:
+            with open(output_path, 'wb') as output:
+                write_payroll_workbook(rows, output, first.strftime('%B %Y'))
+
+        self.stdout.write(self.style.SUCCESS(f'Wrote payroll for {len(rows)} agent(s), {first} to {last}, to {output_path}.'))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from attendance_app.presence import derive_presence_from_logs, find_presence_mismatches, rebuild_presence
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the UserPresence table from the attendance log (backfill), or checks it for drift with --check'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', dest='user_ids', help='Only rebuild these user ids')
+        parser.add_argument('--check', action='store_true', help='Report users whose stored presence differs from the log, without writing')
+
+    def handle(self, *args, **options):
+        user_ids = options['user_ids']
+
+        if options['check']:
+            mismatched = find_presence_mismatches(derive_presence_from_logs(user_ids))
+            if mismatched:
+                self.stdout.write(self.style.WARNING(
+                    f'{len(mismatched)} user(s) out of sync: {", ".join(str(user_id) for user_id in mismatched)}'
+                ))
+            else:
+                self.stdout.write(self.style.SUCCESS('Presence table is consistent with the attendance log.'))
+            return
+
+        self.stdout.write('Rebuilding user presence from the attendance log...')
+        written = rebuild_presence(user_ids)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt presence for {written} user(s).'))
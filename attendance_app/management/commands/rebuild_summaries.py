@@ -0,0 +1,36 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max, Min
+
+from attendance_app.models import AttendanceLog
+from attendance_app.summaries import rebuild_summaries
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds DailyAttendanceSummary rows from the attendance log for a shift date range, in parallel chunks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', type=date.fromisoformat, help='First shift date (YYYY-MM-DD), defaults to the oldest log')
+        parser.add_argument('--end', type=date.fromisoformat, help='Last shift date (YYYY-MM-DD), defaults to the newest log')
+        parser.add_argument('--workers', type=int, default=4, help='Chunks rebuilt at the same time')
+        parser.add_argument('--days-per-chunk', type=int, default=7, help='Shift dates per chunk')
+
+    def handle(self, *args, **options):
+        bounds = AttendanceLog.objects.aggregate(first=Min('shift_date'), last=Max('shift_date'))
+        start = options['start'] or bounds['first']
+        end = options['end'] or bounds['last']
+
+        if start is None or end is None:
+            self.stdout.write(self.style.WARNING('No attendance logs to summarize.'))
+            return
+        if start > end:
+            raise CommandError('--start must not be after --end.')
+
+        self.stdout.write(f'Rebuilding summaries for {start} to {end} with {options["workers"]} worker(s)...')
+        started = time.perf_counter()
+        written = rebuild_summaries(start, end, workers=options['workers'], days_per_chunk=options['days_per_chunk'])
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {written} summary row(s) in {elapsed:.2f}s.'))
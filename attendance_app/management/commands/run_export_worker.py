@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand
+from attendance_app.jobs import claim_next_job, purge_expired_exports, run_export_job
+
+
+class Command(BaseCommand):
+    help = 'Runs queued admin export jobs, writing the files to EXPORT_ROOT'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Process the queue until empty, then exit')
+        parser.add_argument('--poll-interval', type=float, default=2.0, help='Seconds to wait when the queue is empty')
+
+    def handle(self, *args, **options):
+        self.stdout.write('Export worker started...')
+
+        while True:
+            job = claim_next_job()
+
+            if job is None:
+                purged = purge_expired_exports()
+                if purged:
+                    self.stdout.write(f'Purged {purged} expired export(s).')
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+                continue
+
+            self.stdout.write(f'Running export job {job.pk} with {job.params}...')
+            started = time.monotonic()
+            try:
+                job = run_export_job(job)
+            except Exception as exc:
+                self.stderr.write(self.style.ERROR(f'Export job {job.pk} failed: {exc}'))
+                continue
+
+            self.stdout.write(self.style.SUCCESS(
+                f'Export job {job.pk} done: {job.rows_processed} rows in {time.monotonic() - started:.1f}s'
+            ))
@@ -0,0 +1,53 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from attendance_app.scheduler import SCHEDULED_JOBS, due_jobs, run_job, scheduler_identity
+
+
+class Command(BaseCommand):
+    help = 'Runs the built-in scheduler (shift close at 07:00, allocation pre-creation, maintenance) with DB leases so only one node runs each job'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--run', choices=sorted(SCHEDULED_JOBS), help='Run one job immediately and exit')
+        parser.add_argument('--list', action='store_true', help='List the scheduled jobs and exit')
+
+    def handle(self, *args, **options):
+        holder = scheduler_identity()
+
+        if options['list']:
+            for name, (spec, func) in SCHEDULED_JOBS.items():
+                self.stdout.write(f'{name:<24} {spec.expression}  (Asia/Manila)')
+            return
+
+        if options['run']:
+            run = run_job(options['run'], timezone.now(), holder)
+            if run is None:
+                raise CommandError(f"{options['run']} is already running on another node.")
+            self.report(run)
+            return
+
+        self.stdout.write(f'Scheduler started as {holder}...')
+        next_slot = timezone.now().replace(second=0, microsecond=0)
+
+        while True:
+            # Catch up on every minute that passed, e.g. while a long job was running
+            while next_slot <= timezone.now():
+                for name in due_jobs(next_slot):
+                    run = run_job(name, next_slot, holder)
+                    if run is None:
+                        self.stdout.write(f'{name}: claimed by another node for {next_slot:%Y-%m-%d %H:%M}')
+                    else:
+                        self.report(run)
+                next_slot += timedelta(minutes=1)
+
+            time.sleep(max((next_slot - timezone.now()).total_seconds(), 0))
+
+    def report(self, run):
+        if run.succeeded:
+            self.stdout.write(self.style.SUCCESS(
+                f'{run.name}: {run.rows_touched} rows in {run.duration_ms} ms'
+            ))
+        else:
+            self.stderr.write(self.style.ERROR(f'{run.name} failed after {run.duration_ms} ms: {run.error}'))
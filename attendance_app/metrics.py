@@ -0,0 +1,95 @@
+import threading
+from bisect import bisect_left
+from collections import Counter
+
+# Process-wide counters, e.g. cache hits and misses. Nothing is shared between worker processes:
+# every worker reports its own counts, from zero at its start.
+_counters = Counter()
+_lock = threading.Lock()
+
+# Upper bounds of the histogram buckets, per observed quantity
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+HISTOGRAM_BUCKETS = {
+    'request_duration_seconds': DURATION_BUCKETS,
+    'request_sql_seconds': DURATION_BUCKETS,
+    'request_template_seconds': DURATION_BUCKETS,
+    'request_queries': (1, 2, 5, 10, 20, 50, 100, 200, 500),
+    'response_bytes': (1_000, 10_000, 100_000, 1_000_000, 10_000_000, 100_000_000),
+}
+
+# (histogram name, view) -> observations per bucket (the last one is +Inf), then their sum
+_histograms = {}
+
+# Prefix of every metric name in the Prometheus output
+PROMETHEUS_PREFIX = 'attendance_'
+
+
+def increment(name, amount=1):
+    with _lock:
+        _counters[name] += amount
+
+
+def counter_values():
+    """Snapshot of every counter of this process."""
+    with _lock:
+        return dict(_counters)
+
+
+def hit_ratio(hits, misses):
+    """Share of lookups served from the cache, or None before the first lookup."""
+    values = counter_values()
+    total = values.get(hits, 0) + values.get(misses, 0)
+    if not total:
+        return None
+    return values.get(hits, 0) / total
+
+
+def observe(name, view, value):
+    """Record one observation of a HISTOGRAM_BUCKETS quantity for a view."""
+    buckets = HISTOGRAM_BUCKETS[name]
+    with _lock:
+        series = _histograms.get((name, view))
+        if series is None:
+            series = _histograms[name, view] = [0] * (len(buckets) + 1) + [0]
+        series[bisect_left(buckets, value)] += 1
+        series[-1] += value
+
+
+def histogram_summaries():
+    """Count and mean of every histogram, per view: {name: {view: {'count', 'mean'}}}."""
+    with _lock:
+        snapshot = {key: list(series) for key, series in _histograms.items()}
+
+    summaries = {}
+    for (name, view), series in sorted(snapshot.items()):
+        count = sum(series[:-1])
+        summaries.setdefault(name, {})[view] = {'count': count, 'mean': series[-1] / count if count else None}
+    return summaries
+
+
+def prometheus_text():
+    """Every counter and histogram of this process in the Prometheus text exposition format."""
+    with _lock:
+        counters = dict(_counters)
+        snapshot = {key: list(series) for key, series in _histograms.items()}
+
+    lines = []
+    for name, value in sorted(counters.items()):
+        metric = f'{PROMETHEUS_PREFIX}{name}_total'
+        lines += [f'# TYPE {metric} counter', f'{metric} {value}']
+
+    for name, buckets in HISTOGRAM_BUCKETS.items():
+        metric = f'{PROMETHEUS_PREFIX}{name}'
+        views = sorted(view for histogram, view in snapshot if histogram == name)
+        if not views:
+            continue
+        lines.append(f'# TYPE {metric} histogram')
+        for view in views:
+            series = snapshot[name, view]
+            cumulative = 0
+            for bound, observations in zip(buckets + ('+Inf',), series):
+                cumulative += observations
+                lines.append(f'{metric}_bucket{{view="{view}",le="{bound}"}} {cumulative}')
+            lines.append(f'{metric}_sum{{view="{view}"}} {series[-1]}')
+            lines.append(f'{metric}_count{{view="{view}"}} {cumulative}')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:37
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance_app', '0003_rename_break_minutes_used_dailytimeallocation_break1_minutes_used_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserPresence',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='presence', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('state', models.CharField(choices=[('idle', 'Idle'), ('working', 'Working'), ('on_break1', 'On Break 1'), ('on_break2', 'On Break 2'), ('at_lunch', 'At Lunch')], default='idle', max_length=20)),
+                ('state_since', models.DateTimeField(blank=True, null=True)),
+                ('shift_date', models.DateField(blank=True, null=True)),
+            ],
+        ),
+    ]
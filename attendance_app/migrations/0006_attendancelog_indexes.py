@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:42
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance_app', '0005_exportjob'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='attendancelog',
+            index=models.Index(fields=['user', 'timestamp'], name='attlog_user_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='attendancelog',
+            index=models.Index(fields=['user', 'action', 'timestamp'], name='attlog_user_action_ts_idx'),
+        ),
+    ]
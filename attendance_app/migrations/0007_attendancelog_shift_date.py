@@ -0,0 +1,64 @@
+import datetime
+
+from django.db import migrations, models
+from django.utils import timezone
+
+# Rows updated per transaction while backfilling, so large tables never hold one long write lock
+BACKFILL_CHUNK_SIZE = 5000
+
+
+def get_shift_date(moment):
+    """Frozen copy of models.get_shift_date: before 7 AM Manila time belongs to the previous day's shift."""
+    local_moment = timezone.localtime(moment)
+    if local_moment.hour < 7:
+        return local_moment.date() - datetime.timedelta(days=1)
+    return local_moment.date()
+
+
+def backfill_shift_date(apps, schema_editor):
+    AttendanceLog = apps.get_model('attendance_app', 'AttendanceLog')
+    db_alias = schema_editor.connection.alias
+
+    last_id = 0
+    while True:
+        chunk = list(
+            AttendanceLog.objects.using(db_alias)
+            .filter(id__gt=last_id, shift_date__isnull=True)
+            .order_by('id')
+            .only('id', 'timestamp')[:BACKFILL_CHUNK_SIZE]
+        )
+        if not chunk:
+            break
+
+        for log in chunk:
+            log.shift_date = get_shift_date(log.timestamp)
+        AttendanceLog.objects.using(db_alias).bulk_update(chunk, ['shift_date'])
+        last_id = chunk[-1].id
+
+
+class Migration(migrations.Migration):
+
+    # Each backfill chunk commits on its own
+    atomic = False
+
+    dependencies = [
+        ('attendance_app', '0006_attendancelog_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attendancelog',
+            name='shift_date',
+            field=models.DateField(null=True),
+        ),
+        migrations.RunPython(backfill_shift_date, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='attendancelog',
+            name='shift_date',
+            field=models.DateField(db_index=True),
+        ),
+        migrations.AddIndex(
+            model_name='attendancelog',
+            index=models.Index(fields=['user', 'shift_date', 'timestamp'], name='attlog_user_shift_ts_idx'),
+        ),
+    ]
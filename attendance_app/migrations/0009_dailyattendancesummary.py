@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:46
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance_app', '0008_scheduler'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyAttendanceSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('shift_date', models.DateField()),
+                ('first_clock_in', models.DateTimeField(blank=True, null=True)),
+                ('last_clock_out', models.DateTimeField(blank=True, null=True)),
+                ('open_clock_in', models.DateTimeField(blank=True, null=True)),
+                ('worked_minutes', models.IntegerField(default=0)),
+                ('late_minutes', models.IntegerField(default=0)),
+                ('break1_minutes', models.IntegerField(default=0)),
+                ('break2_minutes', models.IntegerField(default=0)),
+                ('lunch_minutes', models.IntegerField(default=0)),
+                ('break1_exceeded', models.BooleanField(default=False)),
+                ('break2_exceeded', models.BooleanField(default=False)),
+                ('lunch_exceeded', models.BooleanField(default=False)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['shift_date'], name='summary_shift_date_idx')],
+                'unique_together': {('user', 'shift_date')},
+            },
+        ),
+    ]
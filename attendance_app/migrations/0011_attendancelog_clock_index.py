@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:00
+
+from django.conf import settings
+from django.db import migrations, models
+
+# Block range index on the append-only timestamp column: a few pages instead of a B-tree,
+# for date range scans (exports, archival, payroll). PostgreSQL only.
+BRIN_INDEX_NAME = 'attlog_timestamp_brin'
+
+
+def create_brin_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    AttendanceLog = apps.get_model('attendance_app', 'AttendanceLog')
+    schema_editor.execute(
+        f'CREATE INDEX IF NOT EXISTS {BRIN_INDEX_NAME} ON {AttendanceLog._meta.db_table} USING brin (timestamp)'
+    )
+
+
+def drop_brin_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f'DROP INDEX IF EXISTS {BRIN_INDEX_NAME}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance_app', '0010_attendancelog_idempotency_key'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='attendancelog',
+            index=models.Index(condition=models.Q(('action__in', ['clock_in', 'clock_out'])), fields=['shift_date', 'user', '-timestamp'], name='attlog_shift_user_clock_idx'),
+        ),
+        migrations.RunPython(create_brin_index, drop_brin_index),
+    ]
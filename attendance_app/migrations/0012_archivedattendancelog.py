@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:04
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance_app', '0011_attendancelog_clock_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedAttendanceLog',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('timestamp', models.DateTimeField()),
+                ('action', models.CharField(max_length=50)),
+                ('note', models.TextField(blank=True, null=True)),
+                ('shift_date', models.DateField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'shift_date', 'timestamp'], name='archlog_user_shift_ts_idx'), models.Index(fields=['shift_date'], name='archlog_shift_date_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:35
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def prepare_active_jobs(apps, schema_editor):
+    """
+    Running jobs start their heartbeat at their start time, and only the newest
+    pending/running job per parameters is kept, so the unique constraint can be added.
+    """
+    ExportJob = apps.get_model('attendance_app', 'ExportJob')
+    ExportJob.objects.filter(status='running').update(heartbeat_at=models.F('started_at'))
+    seen = set()
+    duplicates = []
+    for job_id, params_hash in (
+        ExportJob.objects.filter(status__in=['pending', 'running']).order_by('-created_at').values_list('id', 'params_hash')
+    ):
+        if params_hash in seen:
+            duplicates.append(job_id)
+        seen.add(params_hash)
+    ExportJob.objects.filter(id__in=duplicates).update(status='failed', error='Superseded by a newer identical export.')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance_app', '0012_archivedattendancelog'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='exportjob',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(prepare_active_jobs, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='exportjob',
+            constraint=models.UniqueConstraint(condition=models.Q(('status__in', ['pending', 'running'])), fields=('params_hash',), name='exportjob_active_params_uniq'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:38
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance_app', '0013_exportjob_heartbeat'),
+    ]
+
+    operations = [
+        # The column is unchanged (the default is applied by Django, not the database),
+        # so only the state is altered instead of rebuilding the log table on SQLite
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name='attendancelog',
+                    name='timestamp',
+                    field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+                ),
+            ],
+        ),
+    ]
@@ -3,15 +3,77 @@ from django.contrib.auth.models import User
 from django.utils import timezone
 import datetime
 
+# Shift runs 10 PM to 7 AM (Asia/Manila); anything before 7 AM belongs to the previous day's shift
+SHIFT_END_HOUR = 7
+
+def get_shift_date(moment):
+    """Return the shift date a timestamp belongs to (before 7 AM counts as the previous day)."""
+    local_moment = timezone.localtime(moment)
+    if local_moment.hour < SHIFT_END_HOUR:
+        return local_moment.date() - datetime.timedelta(days=1)
+    return local_moment.date()
+
 class AttendanceLog(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
-    timestamp = models.DateTimeField(auto_now_add=True)
+    timestamp = models.DateTimeField(default=timezone.now, editable=False)  # Imports and backfills pass their own
     action = models.CharField(max_length=50)
     note = models.TextField(blank=True, null=True)  # Optional note field
+    shift_date = models.DateField(db_index=True)  # Night shift the log belongs to, set on save
+    idempotency_key = models.CharField(max_length=64, blank=True, null=True)  # From the tracker form, dedupes resubmits
+
+    class Meta:
+        indexes = [
+            # Per-user history ordered by time (dashboard, tracker, exports)
+            models.Index(fields=['user', 'timestamp'], name='attlog_user_ts_idx'),
+            # Per-user lookups of a given action within a time range
+            models.Index(fields=['user', 'action', 'timestamp'], name='attlog_user_action_ts_idx'),
+            # Per-user logs of one shift, in time order
+            models.Index(fields=['user', 'shift_date', 'timestamp'], name='attlog_user_shift_ts_idx'),
+            # Partial: only clock actions, newest first per user within a shift (latest-action roster)
+            models.Index(
+                fields=['shift_date', 'user', '-timestamp'],
+                condition=models.Q(action__in=['clock_in', 'clock_out']),
+                name='attlog_shift_user_clock_idx',
+            ),
+        ]
+        constraints = [
+            # A tracker form submitted twice (double click, resubmit) records its action once
+            models.UniqueConstraint(
+                fields=['user', 'idempotency_key'],
+                condition=models.Q(idempotency_key__isnull=False),
+                name='attlog_user_idempotency_key_uniq',
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        if self.shift_date is None:
+            self.shift_date = get_shift_date(self.timestamp or timezone.now())
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.user.username} - {self.action} at {self.timestamp}"
 
+class ArchivedAttendanceLog(models.Model):
+    """AttendanceLog rows past the retention period, moved here by archive_logs with their ids."""
+    id = models.BigIntegerField(primary_key=True)  # The id the row had in AttendanceLog
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    timestamp = models.DateTimeField()
+    action = models.CharField(max_length=50)
+    note = models.TextField(blank=True, null=True)
+    shift_date = models.DateField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # Per-user history of a historic month, in time order (dashboard, exports)
+            models.Index(fields=['user', 'shift_date', 'timestamp'], name='archlog_user_shift_ts_idx'),
+            # Whole months across users (admin exports, payroll)
+            models.Index(fields=['shift_date'], name='archlog_shift_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} - {self.action} at {self.timestamp} (archived)"
+
 class DailyTimeAllocation(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     date = models.DateField()
@@ -66,3 +128,186 @@ class DailyTimeAllocation(models.Model):
 
     def __str__(self):
         return f"{self.user.username}'s time allocation for {self.date}"
+
+
+class DailyAttendanceSummary(models.Model):
+    """Per-user rollup of one shift, kept current on every tracker action for reports."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    shift_date = models.DateField()
+    first_clock_in = models.DateTimeField(null=True, blank=True)
+    last_clock_out = models.DateTimeField(null=True, blank=True)
+    open_clock_in = models.DateTimeField(null=True, blank=True)  # Start of the span still being worked
+    worked_minutes = models.IntegerField(default=0)
+    late_minutes = models.IntegerField(default=0)
+    break1_minutes = models.IntegerField(default=0)
+    break2_minutes = models.IntegerField(default=0)
+    lunch_minutes = models.IntegerField(default=0)
+    break1_exceeded = models.BooleanField(default=False)
+    break2_exceeded = models.BooleanField(default=False)
+    lunch_exceeded = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ['user', 'shift_date']
+        indexes = [
+            models.Index(fields=['shift_date'], name='summary_shift_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username}'s summary for {self.shift_date}"
+
+
+class UserPresence(models.Model):
+    """Current state of each user, kept in step with every tracker action."""
+    IDLE = 'idle'
+    WORKING = 'working'
+    ON_BREAK1 = 'on_break1'
+    ON_BREAK2 = 'on_break2'
+    AT_LUNCH = 'at_lunch'
+
+    STATE_CHOICES = [
+        (IDLE, 'Idle'),
+        (WORKING, 'Working'),
+        (ON_BREAK1, 'On Break 1'),
+        (ON_BREAK2, 'On Break 2'),
+        (AT_LUNCH, 'At Lunch'),
+    ]
+
+    # Which state each tracker action leaves the user in
+    ACTION_STATES = {
+        'clock_in': WORKING,
+        'clock_out': IDLE,
+        'start_break1': ON_BREAK1,
+        'end_break1': WORKING,
+        'start_break2': ON_BREAK2,
+        'end_break2': WORKING,
+        'start_lunch': AT_LUNCH,
+        'end_lunch': WORKING,
+    }
+
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='presence')
+    state = models.CharField(max_length=20, choices=STATE_CHOICES, default=IDLE)
+    state_since = models.DateTimeField(null=True, blank=True)
+    shift_date = models.DateField(null=True, blank=True)
+
+    @classmethod
+    def record(cls, user, action, at=None):
+        """Move the user into the state that follows the given action."""
+        at = at or timezone.now()
+        defaults = {'state': cls.ACTION_STATES[action], 'state_since': at}
+        if action == 'clock_in':
+            defaults['shift_date'] = get_shift_date(at)
+        presence, _ = cls.objects.update_or_create(user=user, defaults=defaults)
+        return presence
+
+    @staticmethod
+    def oldest_current_shift(now=None):
+        """
+        Oldest shift a presence may still belong to: the current one or the previous one.
+
+        The 07:00 close idles everyone; a presence from an older shift is left over
+        from a missed close and counts as idle, so it never blocks a clock in.
+        """
+        return get_shift_date(now or timezone.now()) - datetime.timedelta(days=1)
+
+    @classmethod
+    def active(cls, now=None):
+        """Presences that count as clocked in: not idle, and from a current shift."""
+        return cls.objects.exclude(state=cls.IDLE).filter(shift_date__gte=cls.oldest_current_shift(now))
+
+    def is_clocked_in(self, now=None):
+        return (
+            self.state != self.IDLE
+            and self.shift_date is not None
+            and self.shift_date >= self.oldest_current_shift(now)
+        )
+
+    def is_on_break(self):
+        return self.state in (self.ON_BREAK1, self.ON_BREAK2)
+
+    def is_at_lunch(self):
+        return self.state == self.AT_LUNCH
+
+    def __str__(self):
+        return f"{self.user.username} is {self.get_state_display()} since {self.state_since}"
+
+
+class ExportJob(models.Model):
+    """An admin export generated in the background by the export worker."""
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+
+    requested_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    params = models.JSONField(default=dict)
+    params_hash = models.CharField(max_length=40, db_index=True)  # Identical requests share one job
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=PENDING)
+    rows_processed = models.IntegerField(default=0)
+    total_rows = models.IntegerField(default=0)
+    file_path = models.CharField(max_length=255, blank=True)
+    filename = models.CharField(max_length=255, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)  # Last progress write of the running job
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            # At most one queued or running job per set of parameters, even when two admins click at once
+            models.UniqueConstraint(
+                fields=['params_hash'],
+                condition=models.Q(status__in=['pending', 'running']),
+                name='exportjob_active_params_uniq',
+            ),
+        ]
+
+    def progress_percentage(self):
+        if self.status == self.DONE:
+            return 100
+        if not self.total_rows:
+            return 0
+        return min(int(self.rows_processed / self.total_rows * 100), 99)
+
+    def __str__(self):
+        return f"Export job {self.pk} ({self.status})"
+
+
+class JobLease(models.Model):
+    """Lease that lets only one node run a scheduled job for a given slot."""
+    name = models.CharField(max_length=50, primary_key=True)
+    holder = models.CharField(max_length=100, blank=True)
+    expires_at = models.DateTimeField(null=True, blank=True)
+    last_slot = models.DateTimeField(null=True, blank=True)  # Scheduled time of the last claimed run
+
+    def __str__(self):
+        return f"{self.name} held by {self.holder or 'nobody'} until {self.expires_at}"
+
+
+class JobRun(models.Model):
+    """One execution of a scheduled job, kept to watch durations and volumes over time."""
+    name = models.CharField(max_length=50)
+    slot = models.DateTimeField()
+    holder = models.CharField(max_length=100)
+    started_at = models.DateTimeField()
+    finished_at = models.DateTimeField(null=True, blank=True)
+    duration_ms = models.IntegerField(null=True, blank=True)
+    rows_touched = models.IntegerField(default=0)
+    succeeded = models.BooleanField(default=False)
+    error = models.TextField(blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['name', 'started_at'], name='jobrun_name_started_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} run at {self.started_at} ({self.duration_ms} ms, {self.rows_touched} rows)"
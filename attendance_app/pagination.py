@@ -0,0 +1,103 @@
+import base64
+from datetime import datetime
+
+from django.db.models import Q
+
+
+class KeysetPage:
+    """
+    One page of a (timestamp, id) keyset pagination, newest first.
+
+    Iterates like a Paginator page, but fetching it costs O(page size) however
+    deep into the history it is, and there is no COUNT(*).
+    """
+
+    def __init__(self, object_list, has_next, has_previous):
+        self.object_list = object_list
+        self.has_next_page = has_next
+        self.has_previous_page = has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+    def has_next(self):
+        return self.has_next_page
+
+    def has_previous(self):
+        return self.has_previous_page
+
+    def has_other_pages(self):
+        return self.has_next_page or self.has_previous_page
+
+    @property
+    def next_cursor(self):
+        if self.has_next_page:
+            return encode_cursor(self.object_list[-1])
+        return None
+
+    @property
+    def previous_cursor(self):
+        if self.has_previous_page:
+            return encode_cursor(self.object_list[0])
+        return None
+
+
+def encode_cursor(obj):
+    """Opaque url-safe cursor for a row's (timestamp, id) position."""
+    raw = f"{obj.timestamp.isoformat()}|{obj.pk}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Return the (timestamp, id) position of a cursor, or None if it is malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        timestamp, pk = raw.split('|')
+        return datetime.fromisoformat(timestamp), int(pk)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def keyset_paginate(queryset, page_size, after=None, before=None):
+    """
+    Return the page of ``queryset`` (newest first) right after or before a cursor.
+
+    Only page_size + 1 rows are fetched: the extra row tells whether another page exists.
+    """
+    after_position = decode_cursor(after) if after else None
+    before_position = decode_cursor(before) if before else None
+
+    if before_position:
+        timestamp, pk = before_position
+        rows = list(
+            queryset.filter(Q(timestamp__gt=timestamp) | Q(timestamp=timestamp, pk__gt=pk))
+            .order_by('timestamp', 'pk')[:page_size + 1]
+        )
+        has_previous = len(rows) > page_size
+        rows = rows[:page_size]
+        rows.reverse()
+        return KeysetPage(rows, has_next=True, has_previous=has_previous)
+
+    ordered = queryset.order_by('-timestamp', '-pk')
+    if after_position:
+        timestamp, pk = after_position
+        ordered = ordered.filter(Q(timestamp__lt=timestamp) | Q(timestamp=timestamp, pk__lt=pk))
+
+    rows = list(ordered[:page_size + 1])
+    has_next = len(rows) > page_size
+    return KeysetPage(rows[:page_size], has_next=has_next, has_previous=after_position is not None)
+
+
+def cursor_querystring(request):
+    """Current query string without the cursor parameters, ready to have one appended."""
+    params = request.GET.copy()
+    for key in ('after', 'before', 'page'):
+        params.pop(key, None)
+    encoded = params.urlencode()
+    return f"{encoded}&" if encoded else ""
@@ -0,0 +1,237 @@
+import csv
+from itertools import chain
+from datetime import date, datetime
+
+from django.contrib.auth.models import User
+from django.core.exceptions import ImproperlyConfigured
+from django.utils import timezone
+from openpyxl import Workbook
+
+from .archive import month_bounds, month_querysets
+from .exports import ColumnWidthTracker, create_streaming_sheet, register_export_styles, styled_row
+from .summaries import BREAK1_ALLOWANCE, BREAK2_ALLOWANCE, LUNCH_ALLOWANCE, SHIFT_START_TIME
+
+try:
+    import numpy as np
+except ImportError:  # The report is optional, the rest of the app runs without numpy
+    np = None
+
+# Actions as small integer codes so a month of logs fits in flat numeric arrays
+ACTION_CODES = {
+    'clock_in': 1,
+    'clock_out': 2,
+    'start_break1': 3,
+    'end_break1': 4,
+    'start_break2': 5,
+    'end_break2': 6,
+    'start_lunch': 7,
+    'end_lunch': 8,
+}
+
+# 22:00 to 07:00 minus the hour of lunch
+REGULAR_SHIFT_MINUTES = 8 * 60
+
+# Rows fetched per database round trip while loading the month
+LOAD_CHUNK_SIZE = 20000
+
+PAYROLL_HEADERS = [
+    "Username", "Name", "Shifts", "Worked Hours", "Overtime Hours", "Late Count", "Late Minutes",
+    "Break 1 Overruns", "Break 2 Overruns", "Lunch Overruns", "Overrun Minutes",
+]
+
+
+def require_numpy():
+    if np is None:
+        raise ImproperlyConfigured('The payroll report needs numpy (pip install numpy).')
+
+
+def load_month_events(first, last):
+    """
+    Load every log of the month's shifts as columnar arrays with one values_list query per table.
+
+    Returns (user_ids, shift_days, action_codes, timestamps): shift days as date
+    ordinals, timestamps as epoch seconds. Actions the report ignores get code 0.
+    """
+    require_numpy()
+    # Archived months also read the archive table; sort_events orders the events afterwards
+    querysets = [logs.order_by() for logs in month_querysets(first, last)]
+    rows = chain.from_iterable(
+        logs.values_list('user_id', 'shift_date', 'action', 'timestamp').iterator(chunk_size=LOAD_CHUNK_SIZE)
+        for logs in querysets
+    )
+
+    events = np.fromiter(
+        (
+            (user_id, shift_date.toordinal(), ACTION_CODES.get(action, 0), timestamp.timestamp())
+            for user_id, shift_date, action, timestamp in rows
+        ),
+        # No count=: a separate COUNT could disagree with the rows that follow (live shift, archiver)
+        dtype=[('user', np.int64), ('day', np.int64), ('action', np.int8), ('ts', np.float64)],
+    )
+    return events['user'], events['day'], events['action'], events['ts']
+
+
+def shift_start_epochs(shift_days):
+    """Epoch seconds of 22:00 Manila for each shift day ordinal, computed once per distinct day."""
+    days, inverse = np.unique(shift_days, return_inverse=True)
+    starts = np.array([
+        timezone.make_aware(datetime.combine(date.fromordinal(int(day)), SHIFT_START_TIME)).timestamp()
+        for day in days
+    ])
+    return starts[inverse]
+
+
+def sort_events(user_ids, shift_days, timestamps):
+    """
+    Order of the events by (user, shift, time).
+
+    A month of milliseconds fits in 32 bits, so the three keys are packed into
+    one int64 and sorted once, which is several times faster than a lexsort.
+    """
+    day_span = int(shift_days.max() - shift_days.min()) + 1
+    milliseconds = np.round((timestamps - timestamps.min()) * 1000).astype(np.int64)
+    user_span = int(user_ids.max() - user_ids.min()) + 1
+
+    if milliseconds.max() >= 2 ** 32 or user_span * day_span >= 2 ** 31:
+        return np.lexsort((timestamps, shift_days, user_ids))
+
+    shift_keys = (user_ids - user_ids.min()) * day_span + (shift_days - shift_days.min())
+    return np.argsort((shift_keys << 32) | milliseconds)
+
+
+def aggregate_payroll(user_ids, shift_days, action_codes, timestamps):
+    """
+    Per-user payroll totals from columnar event arrays, without a Python loop per event.
+
+    Events are sorted by (user, shift, time); each start is paired with the next
+    event of its kind when that is the matching end of the same shift. Returns a
+    dict of equal-length arrays keyed by column, one entry per user.
+    """
+    require_numpy()
+    if not len(user_ids):
+        return {'user_id': np.array([], dtype=np.int64)}
+
+    order = sort_events(user_ids, shift_days, timestamps)
+    user_ids, shift_days = user_ids[order], shift_days[order]
+    action_codes, timestamps = action_codes[order], timestamps[order]
+
+    # One group per (user, shift)
+    new_group = np.ones(len(user_ids), dtype=bool)
+    new_group[1:] = (user_ids[1:] != user_ids[:-1]) | (shift_days[1:] != shift_days[:-1])
+    groups = np.cumsum(new_group) - 1
+    group_count = int(groups[-1]) + 1
+    group_users = user_ids[new_group]
+
+    def paired_minutes(start_action, end_action, from_first_start=False):
+        start_code, end_code = ACTION_CODES[start_action], ACTION_CODES[end_action]
+        kind = (action_codes == start_code) | (action_codes == end_code)
+        codes, times, kind_groups = action_codes[kind], timestamps[kind], groups[kind]
+        if not len(codes):
+            return np.zeros(group_count)
+
+        same_group = kind_groups[1:] == kind_groups[:-1]
+        closes = np.flatnonzero((codes[1:] == end_code) & (codes[:-1] == start_code) & same_group) + 1
+        if from_first_start:
+            # Repeated starts keep the first one, like summarize_shift does for clock-ins:
+            # carry the index of the start that opened each run forward to its end
+            opens = codes == start_code
+            opens[1:] &= ~((codes[:-1] == start_code) & same_group)
+            opened_at = np.maximum.accumulate(np.where(opens, np.arange(len(codes)), 0))
+            starts = opened_at[closes]
+        else:
+            starts = closes - 1
+        minutes = np.floor((times[closes] - times[starts]) / 60)
+        return np.bincount(kind_groups[closes], weights=minutes, minlength=group_count)
+
+    worked = paired_minutes('clock_in', 'clock_out', from_first_start=True)
+    break1 = paired_minutes('start_break1', 'end_break1')
+    break2 = paired_minutes('start_break2', 'end_break2')
+    lunch = paired_minutes('start_lunch', 'end_lunch')
+
+    # Lateness of the first clock-in of each shift against 22:00
+    clock_ins = np.flatnonzero(action_codes == ACTION_CODES['clock_in'])
+    present_groups, first_index = np.unique(groups[clock_ins], return_index=True)
+    first_clock_ins = clock_ins[first_index]
+    late = np.zeros(group_count)
+    late[present_groups] = np.maximum(
+        np.floor((timestamps[first_clock_ins] - shift_start_epochs(shift_days[first_clock_ins])) / 60), 0,
+    )
+    present = np.zeros(group_count, dtype=bool)
+    present[present_groups] = True
+
+    overtime = np.maximum(worked - REGULAR_SHIFT_MINUTES, 0)
+    break1_over = np.maximum(break1 - BREAK1_ALLOWANCE, 0)
+    break2_over = np.maximum(break2 - BREAK2_ALLOWANCE, 0)
+    lunch_over = np.maximum(lunch - LUNCH_ALLOWANCE, 0)
+
+    # Roll the shifts up per user
+    users, user_index = np.unique(group_users, return_inverse=True)
+
+    def per_user(values):
+        return np.bincount(user_index, weights=values, minlength=len(users))
+
+    return {
+        'user_id': users,
+        'shifts': per_user(present),
+        'worked_minutes': per_user(worked),
+        'overtime_minutes': per_user(overtime),
+        'late_count': per_user(late > 0),
+        'late_minutes': per_user(late),
+        'break1_overruns': per_user(break1_over > 0),
+        'break2_overruns': per_user(break2_over > 0),
+        'lunch_overruns': per_user(lunch_over > 0),
+        'overrun_minutes': per_user(break1_over + break2_over + lunch_over),
+    }
+
+
+def payroll_rows(month):
+    """Report rows (matching PAYROLL_HEADERS) for every agent with logs in the month, by username."""
+    first, last = month_bounds(month)
+    totals = aggregate_payroll(*load_month_events(first, last))
+
+    users = User.objects.in_bulk([int(user_id) for user_id in totals['user_id']])
+    rows = []
+    for index, user_id in enumerate(totals['user_id']):
+        user = users.get(int(user_id))
+        if user is None:
+            continue
+        rows.append([
+            user.username,
+            f"{user.first_name} {user.last_name}".strip(),
+            int(totals['shifts'][index]),
+            round(float(totals['worked_minutes'][index]) / 60, 2),
+            round(float(totals['overtime_minutes'][index]) / 60, 2),
+            int(totals['late_count'][index]),
+            int(totals['late_minutes'][index]),
+            int(totals['break1_overruns'][index]),
+            int(totals['break2_overruns'][index]),
+            int(totals['lunch_overruns'][index]),
+            int(totals['overrun_minutes'][index]),
+        ])
+    rows.sort(key=lambda row: row[0].lower())
+    return rows
+
+
+def write_payroll_csv(rows, output):
+    writer = csv.writer(output)
+    writer.writerow(PAYROLL_HEADERS)
+    writer.writerows(rows)
+
+
+def write_payroll_workbook(rows, output, title):
+    """Write the report rows as one styled sheet."""
+    wb = Workbook(write_only=True)
+    register_export_styles(wb)
+
+    widths = ColumnWidthTracker()
+    widths.track(PAYROLL_HEADERS)
+    for row in rows:
+        widths.track(row)
+
+    sheet = create_streaming_sheet(wb, title, widths)
+    sheet.print_title_rows = '1:1'
+    sheet.append(styled_row(sheet, PAYROLL_HEADERS, 'export_header'))
+    for index, row in enumerate(rows):
+        sheet.append(styled_row(sheet, row, 'export_alt_row' if index % 2 else 'export_row'))
+
+    wb.save(output)
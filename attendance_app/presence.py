@@ -0,0 +1,80 @@
+from django.db import transaction
+from django.db.models import Max, OuterRef, Q, Subquery
+from .models import AttendanceLog, UserPresence, get_shift_date
+
+
+def derive_presence_from_logs(user_ids=None, chunk_size=500):
+    """
+    Replay the attendance log into UserPresence rows (not saved).
+
+    Uses one grouped query for the latest log id and clock-in per user,
+    then fetches the latest logs in chunks. The latest log is the one with the
+    highest timestamp (id breaks ties): imported history can have higher ids
+    than today's actions.
+    """
+    logs = AttendanceLog.objects.filter(action__in=UserPresence.ACTION_STATES.keys())
+    if user_ids is not None:
+        logs = logs.filter(user_id__in=user_ids)
+
+    latest_log = logs.filter(user_id=OuterRef('user_id')).order_by('-timestamp', '-id').values('id')[:1]
+    latest = list(
+        logs.values('user_id').annotate(
+            last_id=Subquery(latest_log),
+            last_clock_in=Max('timestamp', filter=Q(action='clock_in')),
+        )
+    )
+    last_clock_ins = {row['user_id']: row['last_clock_in'] for row in latest}
+    last_ids = [row['last_id'] for row in latest]
+
+    presences = {}
+    for start in range(0, len(last_ids), chunk_size):
+        chunk = AttendanceLog.objects.filter(id__in=last_ids[start:start + chunk_size])
+        for user_id, action, timestamp in chunk.values_list('user_id', 'action', 'timestamp'):
+            last_clock_in = last_clock_ins.get(user_id)
+            presences[user_id] = UserPresence(
+                user_id=user_id,
+                state=UserPresence.ACTION_STATES[action],
+                state_since=timestamp,
+                shift_date=get_shift_date(last_clock_in) if last_clock_in else None,
+            )
+    return presences
+
+
+def find_presence_mismatches(expected):
+    """Compare derived presences against the stored table, returning the differing user ids."""
+    stored = {
+        presence.user_id: presence
+        for presence in UserPresence.objects.filter(user_id__in=expected.keys())
+    }
+    mismatched = []
+    for user_id, presence in expected.items():
+        current = stored.get(user_id)
+        if (
+            current is None
+            or current.state != presence.state
+            or current.state_since != presence.state_since
+            or current.shift_date != presence.shift_date
+        ):
+            mismatched.append(user_id)
+    return mismatched
+
+
+def rebuild_presence(user_ids=None, batch_size=500):
+    """Rebuild the UserPresence table from the attendance log. Returns the number of rows written."""
+    expected = derive_presence_from_logs(user_ids)
+
+    with transaction.atomic():
+        stale = UserPresence.objects.all()
+        if user_ids is not None:
+            stale = stale.filter(user_id__in=user_ids)
+        # Users without any tracker action left go back to idle
+        stale.exclude(user_id__in=expected.keys()).update(state=UserPresence.IDLE, state_since=None, shift_date=None)
+
+        UserPresence.objects.bulk_create(
+            expected.values(),
+            batch_size=batch_size,
+            update_conflicts=True,
+            unique_fields=['user'],
+            update_fields=['state', 'state_since', 'shift_date'],
+        )
+    return len(expected)
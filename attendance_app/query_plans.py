@@ -0,0 +1,25 @@
+from .models import AttendanceLog
+
+# Indexes the hot AttendanceLog queries are expected to use
+EXPECTED_INDEXES = ['attlog_user_ts_idx', 'attlog_user_action_ts_idx', 'attlog_user_shift_ts_idx']
+
+
+def hot_log_queries(user, shift_date):
+    """The hot AttendanceLog queries of tracker_view, admin_dashboard and dashboard, by label."""
+    return {
+        'tracker_view: shift logs': AttendanceLog.objects.filter(
+            user=user, shift_date=shift_date,
+        ).order_by('-timestamp'),
+        'tracker_view: latest clock action': AttendanceLog.objects.filter(
+            user=user, action__in=['clock_in', 'clock_out'], shift_date=shift_date,
+        ).order_by('-timestamp')[:1],
+        'admin_dashboard: user + shift filter': AttendanceLog.objects.filter(
+            user_id=user.id, shift_date=shift_date,
+        ).order_by('-timestamp'),
+        'dashboard: user history': AttendanceLog.objects.filter(user=user).order_by('-timestamp'),
+    }
+
+
+def indexes_used(plan):
+    """The expected composite indexes an EXPLAIN plan mentions."""
+    return [name for name in EXPECTED_INDEXES if name in plan]
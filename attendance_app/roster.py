@@ -0,0 +1,97 @@
+from django.db import connections
+from django.db.models import Exists, OuterRef, Q
+from .models import AttendanceLog, DailyTimeAllocation, UserPresence
+
+
+def compute_roster():
+    """
+    Read who is clocked in, on break or at lunch from the presence table
+    (presences left over from an older shift do not count).
+
+    Returns the (clocked_in_users, break_users, lunch_users) sets of user ids
+    with a single query.
+    """
+    clocked_in_users = set()
+    break_users = set()
+    lunch_users = set()
+
+    states = UserPresence.active().values_list('user_id', 'state')
+    for user_id, state in states:
+        clocked_in_users.add(user_id)
+        if state in (UserPresence.ON_BREAK1, UserPresence.ON_BREAK2):
+            break_users.add(user_id)
+        elif state == UserPresence.AT_LUNCH:
+            lunch_users.add(user_id)
+
+    return clocked_in_users, break_users, lunch_users
+
+
+def compute_roster_from_logs(day):
+    """
+    Work out who is clocked in, on break or at lunch during the given shift from the raw log.
+
+    Returns the (clocked_in_users, break_users, lunch_users) sets of user ids
+    using two queries, however many users there are.
+    """
+    if connections[AttendanceLog.objects.db].features.can_distinct_on_fields:
+        clocked_in_users = clocked_in_by_latest_action(day)
+    else:
+        clocked_in_users = clocked_in_by_no_later_action(day)
+
+    break_users = set()
+    lunch_users = set()
+
+    if not clocked_in_users:
+        return clocked_in_users, break_users, lunch_users
+
+    # One query for every allocation of the shift with an open interval
+    open_allocations = DailyTimeAllocation.objects.filter(date=day).filter(
+        Q(break1_start_time__isnull=False)
+        | Q(break2_start_time__isnull=False)
+        | Q(lunch_start_time__isnull=False)
+    ).values_list('user_id', 'break1_start_time', 'break2_start_time', 'lunch_start_time')
+
+    for user_id, break1_start, break2_start, lunch_start in open_allocations:
+        if user_id not in clocked_in_users:
+            continue
+        if break1_start or break2_start:
+            break_users.add(user_id)
+        if lunch_start:
+            lunch_users.add(user_id)
+
+    return clocked_in_users, break_users, lunch_users
+
+
+def clocked_in_by_latest_action(day):
+    """
+    Users whose latest clock action of the shift is a clock_in (PostgreSQL).
+
+    DISTINCT ON keeps one row per user, walking attlog_shift_user_clock_idx
+    newest first (id breaks timestamp ties) instead of reading every clock action.
+    """
+    latest = (
+        AttendanceLog.objects.filter(shift_date=day, action__in=['clock_in', 'clock_out'])
+        .order_by('user_id', '-timestamp', '-id')
+        .distinct('user_id')
+        .values_list('user_id', 'action')
+    )
+    return {user_id for user_id, action in latest if action == 'clock_in'}
+
+
+def clocked_in_by_no_later_action(day):
+    """
+    Users whose latest clock action of the shift is a clock_in (any backend).
+
+    Same definition as clocked_in_by_latest_action: a clock_in with no later
+    clock action of the same user (id breaks timestamp ties), so a doubled
+    clock_in or a stray clock_out gives the same roster on every backend.
+    """
+    clock_logs = AttendanceLog.objects.filter(shift_date=day, action__in=['clock_in', 'clock_out'])
+    later_clock_action = clock_logs.filter(user_id=OuterRef('user_id')).filter(
+        Q(timestamp__gt=OuterRef('timestamp')) | Q(timestamp=OuterRef('timestamp'), id__gt=OuterRef('id'))
+    )
+    return set(
+        clock_logs.filter(action='clock_in')
+        .filter(~Exists(later_clock_action))
+        .values_list('user_id', flat=True)
+    )
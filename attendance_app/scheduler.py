@@ -0,0 +1,173 @@
+import os
+import socket
+import time as time_module
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import IntegrityError
+from django.db.models import Q
+from django.utils import timezone
+
+from .archive import archive_cutoff, archive_logs
+from .jobs import purge_expired_exports
+from .models import DailyTimeAllocation, JobLease, JobRun, get_shift_date
+from .shift_close import close_open_shifts
+from .summaries import rebuild_summaries
+
+
+class CronSpec:
+    """
+    Minimal cron expression: "minute hour day month weekday", evaluated in Manila time.
+
+    Each field accepts *, */step, a-b, a-b/step and comma separated lists.
+    Weekday 0 is Monday, matching datetime.weekday().
+    """
+
+    RANGES = [(0, 59), (0, 23), (1, 31), (1, 12), (0, 6)]
+
+    def __init__(self, expression):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron expression needs 5 fields: {expression!r}")
+        self.expression = expression
+        self.allowed = [self._parse(field, low, high) for field, (low, high) in zip(fields, self.RANGES)]
+
+    @staticmethod
+    def _parse(field, low, high):
+        values = set()
+        for part in field.split(','):
+            step = 1
+            if '/' in part:
+                part, step = part.split('/')
+                step = int(step)
+            if part == '*':
+                start, end = low, high
+            elif '-' in part:
+                start, end = (int(bound) for bound in part.split('-'))
+            else:
+                start = end = int(part)
+            if start < low or end > high:
+                raise ValueError(f"Cron field {field!r} is outside {low}-{high}")
+            values.update(range(start, end + 1, step))
+        return values
+
+    def matches(self, moment):
+        local_moment = timezone.localtime(moment)
+        minutes, hours, days, months, weekdays = self.allowed
+        return (
+            local_moment.minute in minutes
+            and local_moment.hour in hours
+            and local_moment.day in days
+            and local_moment.month in months
+            and local_moment.weekday() in weekdays
+        )
+
+
+def run_shift_close(now):
+    """07:00 shift close: end open breaks/lunch and clock everyone out."""
+    return sum(close_open_shifts(now).values())
+
+
+def precreate_allocations(now):
+    """Create tonight's time allocations for every active agent before the shift starts."""
+    shift_date = get_shift_date(now)
+    agent_ids = set(User.objects.filter(is_active=True, is_superuser=False).values_list('id', flat=True))
+    existing = set(DailyTimeAllocation.objects.filter(date=shift_date).values_list('user_id', flat=True))
+
+    missing = agent_ids - existing
+    DailyTimeAllocation.objects.bulk_create(
+        [DailyTimeAllocation(user_id=user_id, date=shift_date) for user_id in missing],
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+    return len(missing)
+
+
+def rollup_summaries(now):
+    """Rebuild the summaries of the shift that just ended, catching anything the per-action refresh missed."""
+    previous_shift = get_shift_date(now) - timedelta(days=1)
+    return rebuild_summaries(previous_shift, previous_shift, workers=1)
+
+
+def archive_old_logs(now):
+    """Move the logs of months past the retention period into the archive table."""
+    return archive_logs(archive_cutoff(today=get_shift_date(now)))
+
+
+def purge_exports(now):
+    """Delete export artifacts past their reuse TTL."""
+    return purge_expired_exports()
+
+
+# name -> (cron spec in Manila time, callable(now) returning rows touched)
+SCHEDULED_JOBS = {
+    'shift_close': (CronSpec('0 7 * * *'), run_shift_close),
+    'precreate_allocations': (CronSpec('30 21 * * *'), precreate_allocations),
+    'rollup_summaries': (CronSpec('30 7 * * *'), rollup_summaries),
+    'purge_exports': (CronSpec('15 * * * *'), purge_exports),
+    'archive_logs': (CronSpec('0 8 1 * *'), archive_old_logs),
+}
+
+
+def scheduler_identity():
+    """Name this scheduler process uses when holding leases."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def acquire_lease(name, slot, holder, now=None):
+    """
+    Claim the job's lease for one scheduled slot.
+
+    Fails if another node holds an unexpired lease, or already claimed this slot.
+    """
+    now = now or timezone.now()
+    JobLease.objects.get_or_create(name=name)
+
+    claimed = JobLease.objects.filter(
+        Q(expires_at__isnull=True) | Q(expires_at__lt=now),
+        Q(last_slot__isnull=True) | Q(last_slot__lt=slot),
+        name=name,
+    ).update(
+        holder=holder,
+        expires_at=now + timedelta(seconds=settings.SCHEDULER_LEASE_SECONDS),
+        last_slot=slot,
+    )
+    return bool(claimed)
+
+
+def release_lease(name, holder):
+    JobLease.objects.filter(name=name, holder=holder).update(expires_at=None)
+
+
+def run_job(name, slot, holder):
+    """Run one job under its lease, recording duration and rows touched. Returns the JobRun, or None if not claimed."""
+    spec, func = SCHEDULED_JOBS[name]
+    try:
+        if not acquire_lease(name, slot, holder):
+            return None
+    except IntegrityError:
+        # Another node created the lease row at the same moment
+        return None
+
+    started_at = timezone.now()
+    run = JobRun.objects.create(name=name, slot=slot, holder=holder, started_at=started_at)
+    started = time_module.perf_counter()
+
+    try:
+        run.rows_touched = func(started_at) or 0
+        run.succeeded = True
+    except Exception as exc:
+        run.error = str(exc)
+    finally:
+        run.duration_ms = int((time_module.perf_counter() - started) * 1000)
+        run.finished_at = timezone.now()
+        run.save()
+        release_lease(name, holder)
+
+    return run
+
+
+def due_jobs(slot):
+    """Names of the jobs scheduled for this minute."""
+    return [name for name, (spec, func) in SCHEDULED_JOBS.items() if spec.matches(slot)]
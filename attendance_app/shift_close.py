@@ -0,0 +1,120 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, OuterRef, Q, Subquery, When
+from django.utils import timezone
+
+from .models import AttendanceLog, DailyTimeAllocation, UserPresence, get_shift_date
+from .broadcast import publish_roster_events, roster_event
+from .status import bump_status_version
+from .summaries import refresh_summaries
+
+# Open interval column -> (minutes column, end action, note label)
+OPEN_INTERVALS = {
+    'break1_start_time': ('break1_minutes_used', 'end_break1', 'Break 1'),
+    'break2_start_time': ('break2_minutes_used', 'end_break2', 'Break 2'),
+    'lunch_start_time': ('lunch_minutes_used', 'end_lunch', 'Lunch'),
+}
+
+
+def close_open_shifts(now=None):
+    """
+    End every open break/lunch and clock out everyone still clocked in, set-based.
+
+    Runs in one transaction with a fixed number of queries however many users
+    are affected. Returns a dict of counts per kind of change.
+    """
+    now = now or timezone.now()
+    counts = {'clock_out': 0}
+    counts.update({end_action: 0 for _, end_action, _ in OPEN_INTERVALS.values()})
+
+    with transaction.atomic():
+        # Everyone still clocked in, on break or at lunch
+        open_presences = dict(
+            UserPresence.objects.select_for_update()
+            .exclude(state=UserPresence.IDLE)
+            .values_list('user_id', 'shift_date')
+        )
+
+        # Every allocation with an interval still running
+        open_allocations = list(
+            DailyTimeAllocation.objects.select_for_update().filter(
+                Q(break1_start_time__isnull=False)
+                | Q(break2_start_time__isnull=False)
+                | Q(lunch_start_time__isnull=False)
+            ).values('id', 'user_id', 'date', *OPEN_INTERVALS.keys())
+        )
+
+        synthetic_logs = []
+
+        for start_field, (minutes_field, end_action, label) in OPEN_INTERVALS.items():
+            # Group allocation ids by minutes used so one UPDATE closes them all
+            ids_by_minutes = {}
+            for allocation in open_allocations:
+                started = allocation[start_field]
+                if started is None:
+                    continue
+                minutes_used = int((now - started).total_seconds() // 60)
+                ids_by_minutes.setdefault(minutes_used, []).append(allocation['id'])
+                synthetic_logs.append(AttendanceLog(
+                    user_id=allocation['user_id'],
+                    action=end_action,
+                    note=f'{label} duration: {minutes_used} minutes (auto-ended at shift end)',
+                    shift_date=allocation['date'],
+                ))
+
+            if not ids_by_minutes:
+                continue
+
+            closed = DailyTimeAllocation.objects.filter(
+                id__in=[pk for ids in ids_by_minutes.values() for pk in ids]
+            ).update(**{
+                minutes_field: F(minutes_field) + Case(
+                    *[When(id__in=ids, then=minutes) for minutes, ids in ids_by_minutes.items()],
+                    default=0,
+                    output_field=IntegerField(),
+                ),
+                start_field: None,
+            })
+            counts[end_action] = closed
+
+        # Presences without a shift date close the shift of their last clock in; failing that, the shift
+        # that just ended (at 7 AM sharp get_shift_date(now) is already the next one)
+        undated = [user_id for user_id, shift_date in open_presences.items() if shift_date is None]
+        last_clock_in_dates = dict(
+            AttendanceLog.objects.filter(user_id__in=undated, action='clock_in')
+            .order_by('user_id', 'timestamp', 'id')
+            .values_list('user_id', 'shift_date')
+        ) if undated else {}
+        ended_shift_date = get_shift_date(now - timedelta(minutes=1))
+        for user_id, shift_date in open_presences.items():
+            synthetic_logs.append(AttendanceLog(
+                user_id=user_id,
+                action='clock_out',
+                note='Automatic clock out at shift end',
+                shift_date=shift_date or last_clock_in_dates.get(user_id) or ended_shift_date,
+            ))
+        counts['clock_out'] = len(open_presences)
+
+        AttendanceLog.objects.bulk_create(synthetic_logs, batch_size=1000)
+
+        # Everyone touched is now off duty, since their last synthetic log
+        affected_users = set(open_presences) | {allocation['user_id'] for allocation in open_allocations}
+        UserPresence.objects.filter(user_id__in=affected_users).update(
+            state=UserPresence.IDLE,
+            state_since=Subquery(
+                AttendanceLog.objects.filter(user_id=OuterRef('user_id')).order_by('-id').values('timestamp')[:1]
+            ),
+        )
+
+        refresh_summaries({(log.user_id, log.shift_date) for log in synthetic_logs})
+        bump_status_version(affected_users)
+
+        # Everyone touched shows up as off duty on live dashboards
+        usernames = dict(User.objects.filter(id__in=affected_users).values_list('id', 'username'))
+        publish_roster_events([
+            roster_event(user_id, usernames.get(user_id), 'clock_out', now) for user_id in affected_users
+        ])
+
+    return counts
@@ -0,0 +1,41 @@
+import random
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.db import OperationalError, connection
+
+
+def configure_sqlite(sender, connection, **kwargs):
+    """connection_created hook: apply SQLITE_PRAGMAS (cache size, WAL when enabled...) to SQLite connections."""
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for name, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def is_lock_error(exc):
+    message = str(exc)
+    return 'database is locked' in message or 'database table is locked' in message
+
+
+def retry_on_lock(func):
+    """
+    Retry a write path when SQLite reports lock contention, with exponential backoff and jitter.
+
+    Only retries outside an enclosing transaction: inside one the whole outer
+    transaction has to be retried instead.
+    """
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        retries = settings.SQLITE_LOCK_RETRIES
+        for attempt in range(retries + 1):
+            try:
+                return func(*args, **kwargs)
+            except OperationalError as exc:
+                if attempt == retries or not is_lock_error(exc) or connection.in_atomic_block:
+                    raise
+                delay = settings.SQLITE_LOCK_BACKOFF_SECONDS * 2 ** attempt
+                time.sleep(delay + random.uniform(0, delay))
+    return wrapper
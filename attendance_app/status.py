@@ -0,0 +1,104 @@
+import time
+
+from django.conf import settings
+from django.contrib.auth import SESSION_KEY
+from django.core.cache import cache, caches
+from django.db import transaction
+from django.utils import timezone
+
+from .models import DailyTimeAllocation, UserPresence, get_shift_date
+
+
+def status_version_key(user_id):
+    return f'status-version:{user_id}'
+
+
+def status_version_cache():
+    """The cache alias holding status versions, sized so they are never culled."""
+    return caches['status_versions']
+
+
+def get_status_version(user_id):
+    """
+    Current status version of a user, from the cache only.
+
+    A missing version (first poll, eviction, restart) is replaced by a new one,
+    so ETags handed out before can never match again.
+    """
+    versions = status_version_cache()
+    key = status_version_key(user_id)
+    version = versions.get(key)
+    if version is None:
+        versions.add(key, time.time_ns(), None)
+        version = versions.get(key)
+    return version
+
+
+def bump_status_version(user_ids):
+    """Give users a new status version once the current transaction commits."""
+    def bump():
+        status_version_cache().set_many({status_version_key(user_id): time.time_ns() for user_id in user_ids}, None)
+    transaction.on_commit(bump)
+
+
+def status_etag(user_id):
+    """ETag of a user's status: their version plus the shift date, which rolls over at 7 AM."""
+    return f'"{user_id}-{get_status_version(user_id)}-{get_shift_date(timezone.now()).isoformat()}"'
+
+
+def session_status_etag(request):
+    """
+    ETag for a poll, computed from the session and the cache without any database query.
+
+    The session only holds a user id after a successful login; requests that miss
+    the ETag still go through the normal login check.
+    """
+    user_id = request.session.get(SESSION_KEY)
+    if user_id is None:
+        return None
+    return status_etag(user_id)
+
+
+def build_status(user_id):
+    """Status payload of a user's current shift: presence, ongoing break/lunch and minutes left."""
+    shift_date = get_shift_date(timezone.now())
+    presence = UserPresence.objects.filter(user_id=user_id).first()
+    # A presence left over from an older shift reads as idle
+    is_clocked_in = bool(presence and presence.is_clocked_in())
+    # A shift without an allocation yet has its full allowance left (nothing is created on a GET)
+    allocation = (
+        DailyTimeAllocation.objects.filter(user_id=user_id, date=shift_date).first()
+        or DailyTimeAllocation(user_id=user_id, date=shift_date)
+    )
+
+    return {
+        'shift_date': shift_date.isoformat(),
+        'state': presence.state if is_clocked_in else UserPresence.IDLE,
+        'state_since': presence.state_since.isoformat() if presence and presence.state_since else None,
+        'is_clocked_in': is_clocked_in,
+        'ongoing': {
+            'break1': allocation.break1_start_time.isoformat() if allocation.break1_start_time else None,
+            'break2': allocation.break2_start_time.isoformat() if allocation.break2_start_time else None,
+            'lunch': allocation.lunch_start_time.isoformat() if allocation.lunch_start_time else None,
+        },
+        'minutes_remaining': {
+            'break1': allocation.break1_minutes_remaining(),
+            'break2': allocation.break2_minutes_remaining(),
+            'lunch': allocation.lunch_minutes_remaining(),
+        },
+        'minutes_exceeded': {
+            'break1': allocation.break1_minutes_exceeded(),
+            'break2': allocation.break2_minutes_exceeded(),
+            'lunch': allocation.lunch_minutes_exceeded(),
+        },
+    }
+
+
+def get_status(user_id, etag):
+    """Status payload cached under its ETag, so a new version or shift never serves a stale copy."""
+    key = f'status:{etag}'
+    payload = cache.get(key)
+    if payload is None:
+        payload = build_status(user_id)
+        cache.set(key, payload, settings.STATUS_CACHE_SECONDS)
+    return payload
@@ -0,0 +1,152 @@
+import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import AttendanceLog, DailyAttendanceSummary
+
+# Allowed minutes per shift, matching DailyTimeAllocation
+BREAK1_ALLOWANCE = 15
+BREAK2_ALLOWANCE = 15
+LUNCH_ALLOWANCE = 60
+
+SHIFT_START_TIME = datetime.time(22, 0)
+
+# Start action -> (end action, summary minutes field)
+INTERVAL_ACTIONS = {
+    'start_break1': ('end_break1', 'break1_minutes'),
+    'start_break2': ('end_break2', 'break2_minutes'),
+    'start_lunch': ('end_lunch', 'lunch_minutes'),
+}
+
+SUMMARY_FIELDS = [
+    'first_clock_in', 'last_clock_out', 'open_clock_in', 'worked_minutes', 'late_minutes',
+    'break1_minutes', 'break2_minutes', 'lunch_minutes',
+    'break1_exceeded', 'break2_exceeded', 'lunch_exceeded',
+]
+
+
+def summarize_shift(user_id, shift_date, events):
+    """
+    Build the summary of one user's shift from its (action, timestamp) events in time order.
+
+    Lateness comes from the first clock-in against the 10 PM shift start,
+    and break/lunch minutes from start/end pairs, so nothing is parsed from notes.
+    """
+    summary = DailyAttendanceSummary(user_id=user_id, shift_date=shift_date)
+    shift_start = timezone.make_aware(datetime.datetime.combine(shift_date, SHIFT_START_TIME))
+    open_intervals = {}
+    end_actions = {end_action: (start_action, field) for start_action, (end_action, field) in INTERVAL_ACTIONS.items()}
+
+    for action, timestamp in events:
+        if action == 'clock_in':
+            if summary.first_clock_in is None:
+                summary.first_clock_in = timestamp
+                if timestamp > shift_start:
+                    summary.late_minutes = int((timestamp - shift_start).total_seconds() // 60)
+            if summary.open_clock_in is None:
+                summary.open_clock_in = timestamp
+        elif action == 'clock_out':
+            summary.last_clock_out = timestamp
+            if summary.open_clock_in is not None:
+                summary.worked_minutes += int((timestamp - summary.open_clock_in).total_seconds() // 60)
+                summary.open_clock_in = None
+        elif action in INTERVAL_ACTIONS:
+            open_intervals[action] = timestamp
+        elif action in end_actions:
+            start_action, field = end_actions[action]
+            started = open_intervals.pop(start_action, None)
+            if started is not None:
+                minutes_used = int((timestamp - started).total_seconds() // 60)
+                setattr(summary, field, getattr(summary, field) + minutes_used)
+
+    summary.break1_exceeded = summary.break1_minutes > BREAK1_ALLOWANCE
+    summary.break2_exceeded = summary.break2_minutes > BREAK2_ALLOWANCE
+    summary.lunch_exceeded = summary.lunch_minutes > LUNCH_ALLOWANCE
+    return summary
+
+
+def save_summaries(summaries, batch_size=1000):
+    """Upsert summaries on (user, shift_date)."""
+    DailyAttendanceSummary.objects.bulk_create(
+        summaries,
+        batch_size=batch_size,
+        update_conflicts=True,
+        unique_fields=['user', 'shift_date'],
+        update_fields=SUMMARY_FIELDS + ['updated_at'],
+    )
+
+
+def build_summaries(logs):
+    """Summaries for every (user, shift) present in an AttendanceLog queryset, read as tuples in one pass."""
+    summaries = []
+    current_key = None
+    events = []
+
+    rows = logs.order_by('user_id', 'shift_date', 'timestamp', 'id').values_list(
+        'user_id', 'shift_date', 'action', 'timestamp',
+    )
+    for user_id, shift_date, action, timestamp in rows.iterator(chunk_size=5000):
+        key = (user_id, shift_date)
+        if key != current_key:
+            if current_key is not None:
+                summaries.append(summarize_shift(*current_key, events))
+            current_key = key
+            events = []
+        events.append((action, timestamp))
+
+    if current_key is not None:
+        summaries.append(summarize_shift(*current_key, events))
+
+    for summary in summaries:
+        summary.updated_at = timezone.now()
+    return summaries
+
+
+def refresh_summary(user_id, shift_date):
+    """Re-roll one user's shift after an action: one indexed read of that shift's logs plus one upsert."""
+    summaries = build_summaries(AttendanceLog.objects.filter(user_id=user_id, shift_date=shift_date))
+    save_summaries(summaries)
+    return summaries[0] if summaries else None
+
+
+def refresh_summaries(pairs):
+    """Re-roll a set of (user_id, shift_date) pairs with one read and one bulk upsert."""
+    if not pairs:
+        return 0
+    pair_filter = Q()
+    for user_id, shift_date in pairs:
+        pair_filter |= Q(user_id=user_id, shift_date=shift_date)
+    summaries = build_summaries(AttendanceLog.objects.filter(pair_filter))
+    save_summaries(summaries)
+    return len(summaries)
+
+
+def rebuild_summaries_for_dates(shift_dates):
+    """
+    Rebuild every summary of the given shift dates. Meant to run in a worker thread.
+
+    The dates' old summaries are deleted in the same transaction as the upsert, so
+    a (user, shift) whose logs are gone (archived, fixed) loses its stale row.
+    """
+    try:
+        summaries = build_summaries(AttendanceLog.objects.filter(shift_date__in=shift_dates))
+        with transaction.atomic():
+            DailyAttendanceSummary.objects.filter(shift_date__in=shift_dates).delete()
+            save_summaries(summaries)
+        return len(summaries)
+    finally:
+        # Each worker thread has its own connection
+        connection.close()
+
+
+def rebuild_summaries(start_date, end_date, workers=4, days_per_chunk=7):
+    """Rebuild summaries for an inclusive shift date range, splitting it into chunks run in parallel."""
+    days = (end_date - start_date).days + 1
+    all_dates = [start_date + datetime.timedelta(days=offset) for offset in range(days)]
+    chunks = [all_dates[index:index + days_per_chunk] for index in range(0, len(all_dates), days_per_chunk)]
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return sum(executor.map(rebuild_summaries_for_dates, chunks))
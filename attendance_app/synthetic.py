@@ -0,0 +1,102 @@
+import datetime
+import random
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+
+from .models import AttendanceLog, DailyTimeAllocation
+from .summaries import SHIFT_START_TIME
+from .transitions import INTERVAL_LABELS, INTERVALS
+
+# Interval -> (hours into the shift it usually starts, spread in minutes)
+INTERVAL_SCHEDULE = {
+    'break1': (2, 20),
+    'lunch': (4.5, 30),
+    'break2': (7, 20),
+}
+# Share of intervals that run past their allowance, and of shifts an agent skips
+OVERRUN_RATE = 0.08
+ABSENCE_RATE = 0.03
+# Regular shift length, 22:00 to 07:00
+SHIFT_HOURS = 9
+
+# Users whose shifts are written per transaction
+USERS_PER_BATCH = 50
+
+
+def shift_events(rng, shift_date):
+    """
+    One realistic night shift: its (action, aware timestamp, note) events in time
+    order, and the minutes used per break/lunch kind.
+
+    Clock in around 22:00 (sometimes late), break 1, lunch and break 2 within
+    their 15/15/60-minute allowances except for an occasional overrun, and
+    clock out around 07:00.
+    """
+    shift_start = timezone.make_aware(datetime.datetime.combine(shift_date, SHIFT_START_TIME))
+    clock_in = shift_start + datetime.timedelta(minutes=rng.gauss(-5, 6))
+    late_minutes = int((clock_in - shift_start).total_seconds() // 60)
+    events = [('clock_in', clock_in, f'Late arrival: {late_minutes} minutes' if late_minutes > 0 else None)]
+    minutes_used = {}
+
+    for kind, (hours, spread) in INTERVAL_SCHEDULE.items():
+        allowance = INTERVALS[kind][2]
+        started = shift_start + datetime.timedelta(hours=hours, minutes=rng.uniform(-spread, spread))
+        if rng.random() < OVERRUN_RATE:
+            minutes = rng.randint(allowance + 1, allowance + allowance // 2 + 5)
+        else:
+            minutes = rng.randint(allowance * 2 // 3, allowance)
+        ended = started + datetime.timedelta(minutes=minutes, seconds=rng.randint(0, 59))
+        minutes_used[kind] = minutes
+        events.append((f'start_{kind}', started, None))
+        events.append((f'end_{kind}', ended, f'{INTERVAL_LABELS[kind]} duration: {minutes} minutes'))
+
+    clock_out = shift_start + datetime.timedelta(hours=SHIFT_HOURS, minutes=rng.gauss(2, 8))
+    events.append(('clock_out', clock_out, ''))
+    return events, minutes_used
+
+
+def generate_workforce(user_count, start, end, prefix='synth_agent_', seed=0, progress=None):
+    """
+    Create user_count agents with a night shift on most days from start to end.
+
+    Writes their AttendanceLog events and the matching DailyTimeAllocation
+    minutes with bulk_create, USERS_PER_BATCH users per transaction.
+    Returns (users created, logs written).
+    """
+    rng = random.Random(seed)
+    password = make_password(None)
+    days = [start + datetime.timedelta(days=offset) for offset in range((end - start).days + 1)]
+    # Number after the highest existing suffix, so gaps left by deleted agents never cause a clash
+    suffixes = [name[len(prefix):] for name in User.objects.filter(username__startswith=prefix).values_list('username', flat=True)]
+    first_index = max((int(suffix) for suffix in suffixes if suffix.isdigit()), default=-1) + 1
+    logs_written = 0
+
+    for batch_start in range(0, user_count, USERS_PER_BATCH):
+        names = [f'{prefix}{first_index + index}' for index in range(batch_start, min(batch_start + USERS_PER_BATCH, user_count))]
+        with transaction.atomic():
+            users = User.objects.bulk_create([User(username=name, password=password) for name in names])
+            logs = []
+            allocations = []
+            for index, user in enumerate(users, start=batch_start):
+                for day in days:
+                    # Two rest days a week, staggered across agents, plus random absences
+                    if (day.toordinal() + index) % 7 < 2 or rng.random() < ABSENCE_RATE:
+                        continue
+                    events, minutes_used = shift_events(rng, day)
+                    logs.extend(
+                        AttendanceLog(user=user, action=action, timestamp=timestamp, note=note, shift_date=day)
+                        for action, timestamp, note in events
+                    )
+                    allocations.append(DailyTimeAllocation(user=user, date=day, **{
+                        INTERVALS[kind][1]: minutes for kind, minutes in minutes_used.items()
+                    }))
+            AttendanceLog.objects.bulk_create(logs, batch_size=1000)
+            DailyTimeAllocation.objects.bulk_create(allocations, batch_size=1000)
+        logs_written += len(logs)
+        if progress:
+            progress(batch_start + len(users), logs_written)
+
+    return user_count, logs_written
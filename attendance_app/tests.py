@@ -0,0 +1,147 @@
+from datetime import date, datetime, timedelta
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+
+from .imports import BadgeImport
+from .models import AttendanceLog, DailyTimeAllocation, UserPresence, get_shift_date
+from .query_plans import hot_log_queries, indexes_used
+from .roster import compute_roster
+from .shift_close import close_open_shifts
+
+# Queries of one admin dashboard page whatever its size: user, logs page, user count, roster,
+# allocations of the visible (user, shift date) pairs and the user list (the session comes from the cache)
+ADMIN_DASHBOARD_QUERIES = 6
+
+
+class AdminDashboardQueryCountTests(TestCase):
+    """The admin dashboard must not issue more queries as the page size grows."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', password='admin-password')
+        agents = [User.objects.create_user(f'agent_{index}', password='agent-password') for index in range(6)]
+
+        logs = []
+        allocations = []
+        for offset in range(5):
+            shift_date = date(2026, 1, 1) + timedelta(days=offset)
+            shift_start = timezone.make_aware(datetime(2026, 1, 1, 22)) + timedelta(days=offset)
+            for agent in agents:
+                for minute, action in enumerate(['clock_in', 'start_break1', 'end_break1', 'clock_out']):
+                    logs.append(AttendanceLog(
+                        user=agent, action=action, shift_date=shift_date,
+                        timestamp=shift_start + timedelta(minutes=minute * 30),
+                    ))
+                allocations.append(DailyTimeAllocation(user=agent, date=shift_date, break1_minutes_used=30))
+        AttendanceLog.objects.bulk_create(logs)
+        DailyTimeAllocation.objects.bulk_create(allocations)
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def test_query_count_is_constant_across_page_sizes(self):
+        for size in [5, 10, 25, 50]:
+            with self.subTest(size=size), self.assertNumQueries(ADMIN_DASHBOARD_QUERIES):
+                response = self.client.get('/admin-dashboard/', {'size': size})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(response.context['logs']), size)
+
+
+class HotQueryPlanTests(TestCase):
+    """The hot tracker, admin dashboard and dashboard queries are served by a composite AttendanceLog index."""
+
+    def test_hot_queries_use_a_composite_index(self):
+        agent = User.objects.create_user('agent', password='agent-password')
+        for label, queryset in hot_log_queries(agent, get_shift_date(timezone.now())).items():
+            with self.subTest(label):
+                self.assertTrue(indexes_used(queryset.explain()))
+
+
+class TrackerIdempotencyTests(TestCase):
+    """One rendered tracker form dedupes resubmits of an action, not the other buttons."""
+
+    def setUp(self):
+        self.agent = User.objects.create_user('agent', password='agent-password')
+        self.client.force_login(self.agent)
+
+    def post_action(self, action, key):
+        return self.client.post('/tracker/', {'action': action, 'idempotency_key': key})
+
+    def test_resubmitted_action_is_recorded_once(self):
+        self.post_action('clock_in', 'form-key')
+        self.post_action('clock_in', 'form-key')
+        self.assertEqual(AttendanceLog.objects.filter(user=self.agent, action='clock_in').count(), 1)
+
+    def test_other_action_from_the_same_form_is_recorded(self):
+        self.post_action('clock_in', 'first-form')
+        self.post_action('start_break1', 'second-form')
+        self.post_action('end_break1', 'second-form')
+        self.assertEqual(
+            list(AttendanceLog.objects.filter(user=self.agent).order_by('id').values_list('action', flat=True)),
+            ['clock_in', 'start_break1', 'end_break1'],
+        )
+
+
+class BadgeImportResumeTests(TestCase):
+    """A resumed import adds the same break minutes as one uninterrupted run."""
+
+    ROWS = [
+        {'username': 'badge_agent', 'timestamp': '2025-02-03T22:00:00', 'action': 'clock_in'},
+        {'username': 'badge_agent', 'timestamp': '2025-02-04T00:00:00', 'action': 'start_break1'},
+        {'username': 'badge_agent', 'timestamp': '2025-02-04T00:14:10', 'action': 'end_break1'},
+        {'username': 'badge_agent', 'timestamp': '2025-02-04T07:00:00', 'action': 'clock_out'},
+    ]
+
+    def setUp(self):
+        User.objects.create_user('badge_agent')
+
+    def break1_minutes(self):
+        return list(DailyTimeAllocation.objects.values_list('date', 'break1_minutes_used'))
+
+    def test_single_run(self):
+        BadgeImport(chunk_size=2).run(self.ROWS)
+        self.assertEqual(self.break1_minutes(), [(date(2025, 2, 3), 14)])
+
+    def test_resume_after_open_break(self):
+        BadgeImport(chunk_size=2).run(self.ROWS[:2])
+        BadgeImport(chunk_size=2).run(self.ROWS, start_offset=2)
+        self.assertEqual(AttendanceLog.objects.count(), 4)
+        self.assertEqual(self.break1_minutes(), [(date(2025, 2, 3), 14)])
+
+
+class StalePresenceTests(TestCase):
+    """A presence left behind by a missed shift close neither shows on the roster nor blocks clocking in."""
+
+    def setUp(self):
+        self.agent = User.objects.create_user('agent', password='agent-password')
+        UserPresence.objects.create(
+            user=self.agent,
+            state=UserPresence.WORKING,
+            state_since=timezone.now() - timedelta(days=3),
+            shift_date=get_shift_date(timezone.now()) - timedelta(days=3),
+        )
+        self.client.force_login(self.agent)
+
+    def test_roster_ignores_stale_presence(self):
+        self.assertEqual(compute_roster(), (set(), set(), set()))
+
+    def test_clock_in_over_stale_presence(self):
+        self.client.post('/tracker/', {'action': 'clock_in', 'idempotency_key': 'form-key'})
+        self.assertTrue(AttendanceLog.objects.filter(user=self.agent, action='clock_in').exists())
+        self.assertEqual(compute_roster()[0], {self.agent.id})
+
+
+class ShiftCloseTests(TestCase):
+    """The 7 AM close clocks people out of the shift that just ended, not the one starting."""
+
+    def test_undated_presence_closes_the_ended_shift(self):
+        agent = User.objects.create_user('agent', password='agent-password')
+        shift_start = timezone.make_aware(datetime(2026, 1, 1, 22))
+        UserPresence.objects.create(user=agent, state=UserPresence.WORKING, state_since=shift_start)
+
+        close_open_shifts(now=shift_start + timedelta(hours=9))
+
+        clock_out = AttendanceLog.objects.get(user=agent, action='clock_out')
+        self.assertEqual(clock_out.shift_date, date(2026, 1, 1))
@@ -0,0 +1,120 @@
+from django.conf import settings
+from django.core.cache import caches
+
+from . import metrics
+from .models import AttendanceLog, DailyTimeAllocation, UserPresence
+from .status import get_status_version
+
+
+def compute_tracker_state(user, day, is_today):
+    """
+    Work out a user's tracker state for one shift: allocation, clock state and the derived context.
+
+    Returns a dict with the ``time_allocation``, the earlier shift the user is still
+    clocked in from (``clocked_in_from``, or None) and the template ``context`` values.
+    """
+    # Get or create daily time allocation for the shift
+    time_allocation, created = DailyTimeAllocation.objects.get_or_create(user=user, date=day)
+
+    # Calculate current status
+    current_status = 'idle'
+    ongoing_break1 = bool(time_allocation.break1_start_time)
+    ongoing_break2 = bool(time_allocation.break2_start_time)
+    ongoing_lunch = bool(time_allocation.lunch_start_time)
+
+    # Check if there's an ongoing break or lunch
+    if ongoing_break1:
+        current_status = 'on_break1'
+    if ongoing_break2:
+        current_status = 'on_break2'
+    if ongoing_lunch:
+        current_status = 'at_lunch'
+
+    # Check if user is clocked in across days
+    is_clocked_in = False
+    clocked_in_from = None
+
+    if is_today:
+        # Current state comes from the presence table (single primary-key lookup)
+        presence = UserPresence.objects.filter(user=user).first()
+        if presence and presence.is_clocked_in():
+            is_clocked_in = True
+            if presence.shift_date and presence.shift_date < day:
+                clocked_in_from = presence.shift_date
+    else:
+        # Historic days: the latest clock action of that day decides
+        latest_clock_action = AttendanceLog.objects.filter(
+            user=user,
+            action__in=['clock_in', 'clock_out'],
+            shift_date=day,
+        ).order_by('-timestamp').first()
+        is_clocked_in = bool(latest_clock_action and latest_clock_action.action == 'clock_in')
+
+    if is_clocked_in and not (ongoing_break1 or ongoing_break2 or ongoing_lunch):
+        current_status = 'working'
+
+    # Calculate percentages for progress bars
+    break1_percentage = min(time_allocation.break1_minutes_used / 15 * 100, 100) if time_allocation.break1_minutes_used > 0 else 0
+    break2_percentage = min(time_allocation.break2_minutes_used / 15 * 100, 100) if time_allocation.break2_minutes_used > 0 else 0
+    lunch_percentage = min(time_allocation.lunch_minutes_used / 60 * 100, 100) if time_allocation.lunch_minutes_used > 0 else 0
+
+    context = {
+        'break1_minutes_remaining': time_allocation.break1_minutes_remaining(),
+        'break2_minutes_remaining': time_allocation.break2_minutes_remaining(),
+        'lunch_minutes_remaining': time_allocation.lunch_minutes_remaining(),
+        'break1_minutes_exceeded': time_allocation.break1_minutes_exceeded(),
+        'break2_minutes_exceeded': time_allocation.break2_minutes_exceeded(),
+        'lunch_minutes_exceeded': time_allocation.lunch_minutes_exceeded(),
+        'is_break1_exceeded': time_allocation.is_break1_exceeded(),
+        'is_break2_exceeded': time_allocation.is_break2_exceeded(),
+        'is_lunch_exceeded': time_allocation.is_lunch_exceeded(),
+        'ongoing_break1': ongoing_break1,
+        'ongoing_break2': ongoing_break2,
+        'ongoing_lunch': ongoing_lunch,
+        'current_status': current_status,
+        'break1_minutes_used': time_allocation.break1_minutes_used,
+        'break2_minutes_used': time_allocation.break2_minutes_used,
+        'lunch_minutes_used': time_allocation.lunch_minutes_used,
+        'break1_percentage': break1_percentage,
+        'break2_percentage': break2_percentage,
+        'lunch_percentage': lunch_percentage,
+        'is_clocked_in': is_clocked_in,
+        # Only allow clock actions on the current day, not in history
+        'can_perform_clock_actions': is_today,
+        # Timestamps for ongoing activities
+        'break1_start_time': time_allocation.break1_start_time,
+        'break2_start_time': time_allocation.break2_start_time,
+        'lunch_start_time': time_allocation.lunch_start_time,
+    }
+
+    return {
+        'time_allocation': time_allocation,
+        'clocked_in_from': clocked_in_from,
+        'context': context,
+    }
+
+
+def tracker_state_key(user_id, day, is_today):
+    """
+    Cache key of a tracker state, tied to the user's status version.
+
+    Every action and the shift close bump that version when they commit, so
+    writes invalidate the cached state without having to find and delete it.
+    """
+    return f'tracker-state:{user_id}:{day.isoformat()}:{int(is_today)}:{get_status_version(user_id)}'
+
+
+def get_tracker_state(user, day, is_today):
+    """Tracker state from the cache, computed and stored on a miss. Hits and misses are counted."""
+    cache = caches[settings.TRACKER_CACHE_ALIAS]
+    key = tracker_state_key(user.id, day, is_today)
+
+    state = cache.get(key)
+    if state is not None:
+        metrics.increment('tracker_cache_hits')
+        return state
+
+    metrics.increment('tracker_cache_misses')
+    state = compute_tracker_state(user, day, is_today)
+    cache.set(key, state, settings.TRACKER_CACHE_SECONDS)
+    return state
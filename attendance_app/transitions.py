@@ -0,0 +1,57 @@
+from django.db.models import F
+
+from .models import DailyTimeAllocation
+
+# Interval -> (start column, minutes column, allowance in minutes)
+INTERVALS = {
+    'break1': ('break1_start_time', 'break1_minutes_used', 15),
+    'break2': ('break2_start_time', 'break2_minutes_used', 15),
+    'lunch': ('lunch_start_time', 'lunch_minutes_used', 60),
+}
+
+# Names shown in tracker messages and duration notes
+INTERVAL_LABELS = {'break1': 'Break 1', 'break2': 'Break 2', 'lunch': 'Lunch'}
+
+# Every action tracker_view records
+TRACKER_ACTIONS = frozenset(
+    ['clock_in', 'clock_out']
+    + [f'start_{kind}' for kind in INTERVALS]
+    + [f'end_{kind}' for kind in INTERVALS]
+)
+
+
+def start_interval(allocation, kind, now):
+    """
+    Open a break or lunch with one conditional UPDATE.
+
+    The row only matches while no break or lunch is open and the allowance is
+    not exceeded, so of two racing requests exactly one starts it. Returns
+    whether this request did.
+    """
+    start_field, minutes_field, allowance = INTERVALS[kind]
+    conditions = {f'{field}__isnull': True for field, _, _ in INTERVALS.values()}
+    conditions[f'{minutes_field}__lte'] = allowance
+
+    started = DailyTimeAllocation.objects.filter(pk=allocation.pk, **conditions).update(**{start_field: now})
+    return started == 1
+
+
+def end_interval(allocation, kind, now):
+    """
+    Close a break or lunch, adding its minutes with an F() increment.
+
+    The UPDATE is conditioned on the start time it was computed from, so a
+    concurrent end of the same interval updates nothing instead of counting
+    the minutes twice. Returns the minutes used, or None if nothing was open.
+    """
+    start_field, minutes_field, _ = INTERVALS[kind]
+    started = DailyTimeAllocation.objects.filter(pk=allocation.pk).values_list(start_field, flat=True).first()
+    if started is None:
+        return None
+
+    minutes_used = int((now - started).total_seconds() // 60)
+    ended = DailyTimeAllocation.objects.filter(pk=allocation.pk, **{start_field: started}).update(**{
+        minutes_field: F(minutes_field) + minutes_used,
+        start_field: None,
+    })
+    return minutes_used if ended else None
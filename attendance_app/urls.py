@@ -9,4 +9,12 @@ urlpatterns = [
     path('admin-dashboard/', views.admin_dashboard, name='admin_dashboard'),
     path('export-csv/', views.export_csv, name='export_csv'),
     path('admin-export-csv/', views.admin_export_csv, name='admin_export_csv'),
+    path('admin-export-jobs/', views.admin_export_job_start, name='admin_export_job_start'),
+    path('admin-export-jobs/<int:job_id>/', views.admin_export_job_status, name='admin_export_job_status'),
+    path('admin-export-jobs/<int:job_id>/download/', views.admin_export_job_download, name='admin_export_job_download'),
+    path('admin-dashboard/events/', views.admin_roster_events, name='admin_roster_events'),
+    path('api/status/', views.api_status, name='api_status'),
+    path('admin-metrics/', views.admin_metrics, name='admin_metrics'),
+    path('admin-metrics/prometheus/', views.admin_metrics_prometheus, name='admin_metrics_prometheus'),
+    path('admin-payroll-report/', views.admin_payroll_report, name='admin_payroll_report'),
 ]
@@ -1,21 +1,47 @@
-from django.shortcuts import render, redirect
+from django.shortcuts import get_object_or_404, render, redirect
+from django.urls import reverse
+from django.views.decorators.http import condition, require_POST
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required, user_passes_test
-from django.http import HttpResponse
-from .models import AttendanceLog, DailyTimeAllocation
+from django.core.handlers.asgi import ASGIRequest
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseBadRequest, HttpResponseForbidden, JsonResponse, StreamingHttpResponse
+from asgiref.sync import sync_to_async
+from .models import AttendanceLog, DailyTimeAllocation, ExportJob, UserPresence, get_shift_date
+from .roster import compute_roster
+from .exports import (
+    ACTIVITY_HEADERS, SUMMARY_HEADERS, TEXT_EXPORT_FORMATS, XLSX_CONTENT_TYPE, ColumnWidthTracker,
+    iter_activity_rows, stream_text_export, write_streaming_admin_workbook,
+)
+from .jobs import enqueue_export
+from .shift_close import close_open_shifts
+from .summaries import refresh_summary
+from .status import bump_status_version, get_status, session_status_etag, status_etag
+from .tracker_state import compute_tracker_state, get_tracker_state
+from . import metrics
+from .transitions import INTERVAL_LABELS, INTERVALS, end_interval, start_interval
+from .sqlite import retry_on_lock
+from .broadcast import RESYNC, get_broadcast, publish_roster_events, roster_event
+from .archive import archived_logs
+from .payroll import month_bounds, payroll_rows, write_payroll_csv, write_payroll_workbook
+from .postgres import is_postgresql, stream_copy_csv
 from django.utils import timezone
+from django.utils.crypto import constant_time_compare
+import asyncio
 import csv
-from datetime import date, datetime, timedelta, time
+import json
+import os
+import tempfile
+import uuid
+from datetime import datetime, time
+from django.db import IntegrityError, transaction
 from django.db.models import Q
 from django.contrib import messages
-from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
+from .pagination import cursor_querystring, keyset_paginate
 from django.contrib.auth.models import User
 from collections import defaultdict
-from django.utils.timezone import localtime
 import pytz
 from django.core.management.base import BaseCommand
 from django.conf import settings
-from openpyxl.utils import get_column_letter
 
 # 👤 LOGIN
 def login_view(request):
@@ -46,365 +72,232 @@ def logout_view(request):
     logout(request)
     return redirect('login')
 
+def record_tracker_action(user, log):
+    """
+    Keep everything derived from the log in step with a new tracker action.
+
+    Called inside the action's transaction: presence, the shift summary, the
+    status API version and the live roster feed all follow the same log.
+    """
+    UserPresence.record(user, log.action, log.timestamp)
+    refresh_summary(user.id, log.shift_date)
+    bump_status_version([user.id])
+    publish_roster_events([roster_event(user.id, user.username, log.action, log.timestamp)])
+
+@retry_on_lock
+def tracker_action(request, action, idempotency_key, time_allocation, is_clocked_in, on_break):
+    """
+    Apply one tracker POST action and redirect back to the tracker.
+
+    Break and lunch transitions are conditional UPDATEs (see transitions.py):
+    the Python checks only pick the message, the database decides who wins a race.
+    """
+    # CLOCK IN
+    if action == 'clock_in':
+        if is_clocked_in:
+            messages.error(request, 'You are already clocked in.')
+            return redirect('tracker')
+        
+        now = timezone.now()
+        
+        # Get Manila timezone
+        manila_tz = pytz.timezone('Asia/Manila')
+        now_manila = now.astimezone(manila_tz)
+        
+        # Calculate if late
+        is_late = False
+        late_minutes = 0
+        
+        # Determine shift date - if before 7 AM, shift is for previous day
+        shift_date = get_shift_date(now)
+        
+        # Calculate shift start time (10 PM on shift date)
+        shift_start_time = time(22, 0)
+        shift_start_datetime = datetime.combine(shift_date, shift_start_time)
+        shift_start_datetime = pytz.timezone('Asia/Manila').localize(shift_start_datetime)
+        
+        # Check if clocked in after shift start time
+        if now_manila > shift_start_datetime:
+            is_late = True
+            time_diff = now_manila - shift_start_datetime
+            late_minutes = int(time_diff.total_seconds() // 60)
+        
+        # Create the log with late information if applicable
+        note = None
+        if is_late:
+            note = f"Late arrival: {late_minutes} minutes"
+        
+        with transaction.atomic():
+            log = AttendanceLog(user=request.user, action='clock_in', note=note, idempotency_key=idempotency_key)
+            log.save()
+            record_tracker_action(request.user, log)
+        
+        if is_late:
+            messages.warning(request, f'Clocked in {late_minutes} minutes late!')
+        else:
+            messages.success(request, 'Clocked in successfully!')
+    
+    # CLOCK OUT
+    elif action == 'clock_out':
+        clock_out_note = request.POST.get('clock_out_note', '')
+        with transaction.atomic():
+            log = AttendanceLog(user=request.user, action='clock_out', note=clock_out_note, idempotency_key=idempotency_key)
+            log.save()
+            record_tracker_action(request.user, log)
+        messages.success(request, 'Clocked out successfully!')
+    
+    # START BREAK 1 / BREAK 2 / LUNCH
+    elif action in ('start_break1', 'start_break2', 'start_lunch'):
+        kind = action[len('start_'):]
+        label = INTERVAL_LABELS[kind]
+        if not is_clocked_in:
+            messages.error(request, f'You must be clocked in to take {"lunch" if kind == "lunch" else "a break"}.')
+        elif on_break:
+            messages.error(request, 'You are already on a break or lunch.')
+        elif getattr(time_allocation, f'is_{kind}_exceeded')():
+            messages.error(request, f'You have already used all your {label.lower()} time ({INTERVALS[kind][2]} minutes).')
+        else:
+            with transaction.atomic():
+                started = start_interval(time_allocation, kind, timezone.now())
+                if started:
+                    log = AttendanceLog(user=request.user, action=action, idempotency_key=idempotency_key)
+                    log.save()
+                    record_tracker_action(request.user, log)
+            if started:
+                messages.success(request, f'{label} started!')
+            else:
+                messages.error(request, 'You are already on a break or lunch.')
+    
+    # END BREAK 1 / BREAK 2 / LUNCH
+    elif action in ('end_break1', 'end_break2', 'end_lunch'):
+        kind = action[len('end_'):]
+        label = INTERVAL_LABELS[kind]
+        with transaction.atomic():
+            minutes_used = end_interval(time_allocation, kind, timezone.now())
+            if minutes_used is not None:
+                log = AttendanceLog(
+                    user=request.user,
+                    action=action,
+                    note=f'{label} duration: {minutes_used} minutes',
+                    idempotency_key=idempotency_key,
+                )
+                log.save()
+                record_tracker_action(request.user, log)
+        if minutes_used is None:
+            messages.error(request, f'No {label.lower()} in progress.')
+        else:
+            messages.success(request, f'{label} ended. You used {minutes_used} minutes.')
+    
+    return redirect('tracker')
+
 # 🧍 EMPLOYEE VIEW
 @login_required
 def tracker_view(request):
     # Check if a specific date was requested
     requested_date = request.GET.get('date')
     
+    # Days are night shifts: before 7 AM still belongs to the previous day's shift
+    current_shift_date = get_shift_date(timezone.now())
+    
     if requested_date:
         try:
             selected_date = datetime.strptime(requested_date, '%Y-%m-%d').date()
             today = selected_date
-            is_today = (today == date.today())
+            is_today = (today == current_shift_date)
         except ValueError:
-            selected_date = today = date.today()
+            selected_date = today = current_shift_date
             is_today = True
     else:
-        selected_date = today = date.today()
+        selected_date = today = current_shift_date
         is_today = True
     
-    # Get or create daily time allocation for today
-    time_allocation, created = DailyTimeAllocation.objects.get_or_create(
-        user=request.user,
-        date=today,
-    )
-    
-    # Define shift hours (10 PM to 7 AM next day)
-    now = localtime(timezone.now())
-    current_date = now.date()
-    
-    # Create datetime objects for start and end of shift
-    # If current time is before 7 AM, shift started yesterday at 10 PM
-    if now.time() < time(7, 0):
-        shift_start_date = current_date - timedelta(days=1)
-        shift_end_date = current_date
+    # Tracker state for the shift: a single cache hit on GET, computed fresh when acting on it
+    # (both may create the shift's allocation, so they retry on SQLite lock contention)
+    if request.method == 'POST':
+        state = retry_on_lock(compute_tracker_state)(request.user, today, is_today)
     else:
-        shift_start_date = current_date
-        shift_end_date = current_date + timedelta(days=1)
-        
-    shift_start = datetime.combine(shift_start_date, time(22, 0)).replace(tzinfo=pytz.timezone('Asia/Manila'))
-    shift_end = datetime.combine(shift_end_date, time(7, 0)).replace(tzinfo=pytz.timezone('Asia/Manila'))
-    
-    # Check for late clock in
-    clocked_in_late = False
-    minutes_late = 0
-    first_clock_in = None
-
-    # Retrieve logs for the user on the selected date
-    logs = AttendanceLog.objects.filter(user=request.user, timestamp__date=today).order_by('-timestamp')
+        state = retry_on_lock(get_tracker_state)(request.user, today, is_today)
     
-    # Pagination
-    page = request.GET.get('page', 1)
-    paginator = Paginator(logs, 10)  # Show 10 activities per page
+    time_allocation = state['time_allocation']
+    is_clocked_in = state['context']['is_clocked_in']
+    ongoing_break1 = state['context']['ongoing_break1']
+    ongoing_break2 = state['context']['ongoing_break2']
+    ongoing_lunch = state['context']['ongoing_lunch']
     
-    try:
-        page_obj = paginator.page(page)
-    except PageNotAnInteger:
-        page_obj = paginator.page(1)
-    except EmptyPage:
-        page_obj = paginator.page(paginator.num_pages)
-    
-    # Calculate current status
-    current_status = 'idle'
-    ongoing_break1 = False
-    ongoing_break2 = False
-    ongoing_lunch = False
-    
-    # Check if there's an ongoing break or lunch
-    if time_allocation.break1_start_time:
-        ongoing_break1 = True
-        current_status = 'on_break1'
-    
-    if time_allocation.break2_start_time:
-        ongoing_break2 = True
-        current_status = 'on_break2'
-
-    if time_allocation.lunch_start_time:
-        ongoing_lunch = True
-        current_status = 'at_lunch'
-
-    # Check if user is clocked in across days
-    # First, check if the user is clocked in today
-    is_clocked_in = False
-    clocked_in_today = AttendanceLog.objects.filter(
-        user=request.user, 
-        action='clock_in',
-        timestamp__date=today
-    ).exists()
-    
-    clocked_out_today = AttendanceLog.objects.filter(
-        user=request.user, 
-        action='clock_out',
-        timestamp__date=today
-    ).exists()
-    
-    # If viewing today, we also need to check if they're still clocked in from yesterday
-    if is_today:
-        # If not clocked in today, check if they clocked in yesterday but didn't clock out
-        yesterday = date.today() - timedelta(days=1)
-        if not clocked_in_today and not clocked_out_today:
-            yesterday_clock_in = AttendanceLog.objects.filter(
-                user=request.user,
-                action='clock_in',
-                timestamp__date=yesterday
-            ).order_by('-timestamp').first()
-            
-            yesterday_clock_out = AttendanceLog.objects.filter(
-                user=request.user,
-                action='clock_out',
-                timestamp__date=yesterday
-            ).order_by('-timestamp').first()
-            
-            # If they clocked in yesterday and either didn't clock out or clocked in after clocking out
-            if yesterday_clock_in and (not yesterday_clock_out or yesterday_clock_in.timestamp > yesterday_clock_out.timestamp):
-                # They're still clocked in from yesterday
-                is_clocked_in = True
-                # Create a note that they're still clocked in from yesterday
-                messages.info(request, f"You are still clocked in from yesterday ({yesterday.strftime('%Y-%m-%d')})")
-    
-    # Get the latest clock action for today
-    latest_clock_action = AttendanceLog.objects.filter(
-        user=request.user,
-        action__in=['clock_in', 'clock_out'],
-        timestamp__date=today
-    ).order_by('-timestamp').first()
-
-    # If the latest action is clock_in, they are clocked in
-    if latest_clock_action and latest_clock_action.action == 'clock_in':
-        is_clocked_in = True
-        if not (ongoing_break1 or ongoing_break2 or ongoing_lunch):
-            current_status = 'working'
-    
-    # Only allow clock actions on the current day, not in history
-    can_perform_clock_actions = is_today
+    if is_today and state['clocked_in_from']:
+        # They're still clocked in from yesterday
+        messages.info(request, f"You are still clocked in from yesterday ({state['clocked_in_from'].strftime('%Y-%m-%d')})")
 
     # Handle POST request for action submission
     if request.method == 'POST':
         action = request.POST.get('action')
-        
-        # CLOCK IN
-        if action == 'clock_in':
-            now = timezone.now()
-            
-            # Get Manila timezone
-            manila_tz = pytz.timezone('Asia/Manila')
-            now_manila = now.astimezone(manila_tz)
-            
-            # Calculate if late
-            is_late = False
-            late_minutes = 0
-            
-            # Determine shift date - if before 7 AM, shift is for previous day
-            shift_date = now_manila.date()
-            if now_manila.hour < 7:
-                shift_date = shift_date - timedelta(days=1)
-            
-            # Calculate shift start time (10 PM on shift date)
-            shift_start_time = time(22, 0)
-            shift_start_datetime = datetime.combine(shift_date, shift_start_time)
-            shift_start_datetime = pytz.timezone('Asia/Manila').localize(shift_start_datetime)
-            
-            # Check if clocked in after shift start time
-            if now_manila > shift_start_datetime:
-                is_late = True
-                time_diff = now_manila - shift_start_datetime
-                late_minutes = int(time_diff.total_seconds() // 60)
-            
-            # Create the log with late information if applicable
-            note = None
-            if is_late:
-                note = f"Late arrival: {late_minutes} minutes"
-            
-            log = AttendanceLog(user=request.user, action='clock_in', note=note)
-            log.save()
-            
-            if is_late:
-                messages.warning(request, f'Clocked in {late_minutes} minutes late!')
-            else:
-                messages.success(request, 'Clocked in successfully!')
-                
-            return redirect('tracker')
-        
-        # CLOCK OUT
-        elif action == 'clock_out':
-            clock_out_note = request.POST.get('clock_out_note', '')
-            log = AttendanceLog(user=request.user, action='clock_out', note=clock_out_note)
-            log.save()
-            messages.success(request, 'Clocked out successfully!')
-            return redirect('tracker')
-        
-        # START BREAK 1
-        elif action == 'start_break1':
-            if not is_clocked_in:
-                messages.error(request, 'You must be clocked in to take a break.')
-            elif ongoing_break1 or ongoing_break2 or ongoing_lunch:
-                messages.error(request, 'You are already on a break or lunch.')
-            elif time_allocation.is_break1_exceeded():
-                messages.error(request, 'You have already used all your break 1 time (15 minutes).')
-            else:
-                time_allocation.break1_start_time = timezone.now()
-                time_allocation.save()
-                log = AttendanceLog(user=request.user, action='start_break1')
-                log.save()
-                messages.success(request, 'Break 1 started!')
-            return redirect('tracker')
-        
-        # START BREAK 2
-        elif action == 'start_break2':
-            if not is_clocked_in:
-                messages.error(request, 'You must be clocked in to take a break.')
-            elif ongoing_break1 or ongoing_break2 or ongoing_lunch:
-                messages.error(request, 'You are already on a break or lunch.')
-            elif time_allocation.is_break2_exceeded():
-                messages.error(request, 'You have already used all your break 2 time (15 minutes).')
-            else:
-                time_allocation.break2_start_time = timezone.now()
-                time_allocation.save()
-                log = AttendanceLog(user=request.user, action='start_break2')
-                log.save()
-                messages.success(request, 'Break 2 started!')
+        # Each rendered form carries a fresh key: a double click or resubmit is recorded once.
+        # The key is scoped to the action, since every button of the page shares it: another
+        # action sent from the same page (second click, back navigation) is still recorded.
+        form_key = request.POST.get('idempotency_key', '')[:48]
+        idempotency_key = f'{action}:{form_key}' if form_key and action else None
+        
+        if idempotency_key and AttendanceLog.objects.filter(user=request.user, idempotency_key=idempotency_key).exists():
+            messages.info(request, 'That action was already recorded.')
             return redirect('tracker')
         
-        # END BREAK 1
-        elif action == 'end_break1':
-            if not ongoing_break1:
-                messages.error(request, 'No break 1 in progress.')
-            else:
-                # Calculate minutes used
-                break_duration = timezone.now() - time_allocation.break1_start_time
-                minutes_used = break_duration.total_seconds() // 60
-                
-                # Update time allocation
-                time_allocation.break1_minutes_used += int(minutes_used)
-                time_allocation.break1_start_time = None
-                time_allocation.save()
-                
-                log = AttendanceLog(
-                    user=request.user, 
-                    action='end_break1',
-                    note=f'Break 1 duration: {int(minutes_used)} minutes'
-                )
-                log.save()
-                messages.success(request, f'Break 1 ended. You used {int(minutes_used)} minutes.')
-            return redirect('tracker')
-        
-        # END BREAK 2
-        elif action == 'end_break2':
-            if not ongoing_break2:
-                messages.error(request, 'No break 2 in progress.')
-            else:
-                # Calculate minutes used
-                break_duration = timezone.now() - time_allocation.break2_start_time
-                minutes_used = break_duration.total_seconds() // 60
-                
-                # Update time allocation
-                time_allocation.break2_minutes_used += int(minutes_used)
-                time_allocation.break2_start_time = None
-                time_allocation.save()
-                
-                log = AttendanceLog(
-                    user=request.user, 
-                    action='end_break2',
-                    note=f'Break 2 duration: {int(minutes_used)} minutes'
-                )
-                log.save()
-                messages.success(request, f'Break 2 ended. You used {int(minutes_used)} minutes.')
-            return redirect('tracker')
-        
-        # START LUNCH
-        elif action == 'start_lunch':
-            if not is_clocked_in:
-                messages.error(request, 'You must be clocked in to take lunch.')
-            elif ongoing_break1 or ongoing_break2 or ongoing_lunch:
-                messages.error(request, 'You are already on a break or lunch.')
-            elif time_allocation.is_lunch_exceeded():
-                messages.error(request, 'You have already used all your lunch time (60 minutes).')
-            else:
-                time_allocation.lunch_start_time = timezone.now()
-                time_allocation.save()
-                log = AttendanceLog(user=request.user, action='start_lunch')
-                log.save()
-                messages.success(request, 'Lunch started!')
-            return redirect('tracker')
-        
-        # END LUNCH
-        elif action == 'end_lunch':
-            if not ongoing_lunch:
-                messages.error(request, 'No lunch in progress.')
-            else:
-                # Calculate minutes used
-                lunch_duration = timezone.now() - time_allocation.lunch_start_time
-                minutes_used = lunch_duration.total_seconds() // 60
-                
-                # Update time allocation
-                time_allocation.lunch_minutes_used += int(minutes_used)
-                time_allocation.lunch_start_time = None
-                time_allocation.save()
-                
-                log = AttendanceLog(
-                    user=request.user, 
-                    action='end_lunch',
-                    note=f'Lunch duration: {int(minutes_used)} minutes'
-                )
-                log.save()
-                messages.success(request, f'Lunch ended. You used {int(minutes_used)} minutes.')
+        try:
+            return tracker_action(request, action, idempotency_key, time_allocation, is_clocked_in,
+                                  ongoing_break1 or ongoing_break2 or ongoing_lunch)
+        except IntegrityError:
+            # A concurrent duplicate of this form got in first; its transaction is the one kept
+            messages.info(request, 'That action was already recorded.')
             return redirect('tracker')
     
-    # Calculate percentages for progress bars
-    break1_percentage = min(time_allocation.break1_minutes_used / 15 * 100, 100) if time_allocation.break1_minutes_used > 0 else 0
-    break2_percentage = min(time_allocation.break2_minutes_used / 15 * 100, 100) if time_allocation.break2_minutes_used > 0 else 0
-    lunch_percentage = min(time_allocation.lunch_minutes_used / 60 * 100, 100) if time_allocation.lunch_minutes_used > 0 else 0
+    # Retrieve logs for the user's selected shift (served by the (user, shift_date, timestamp) index)
+    logs = AttendanceLog.objects.filter(user=request.user, shift_date=today).order_by('-timestamp')
     
+    # Keyset pagination on (timestamp, id): 10 activities per page, no OFFSET or COUNT(*)
+    page_obj = keyset_paginate(logs, 10, after=request.GET.get('after'), before=request.GET.get('before'))
+
     # Prepare context with all necessary data
     context = {
-        'logs': logs,
+        'logs': page_obj,
         'page_obj': page_obj,
-        'today': date.today(),
+        'pagination_query': cursor_querystring(request),
+        'today': current_shift_date,
         'selected_date': selected_date,
         'is_today': is_today,
-        'break1_minutes_remaining': time_allocation.break1_minutes_remaining(),
-        'break2_minutes_remaining': time_allocation.break2_minutes_remaining(),
-        'lunch_minutes_remaining': time_allocation.lunch_minutes_remaining(),
-        'break1_minutes_exceeded': time_allocation.break1_minutes_exceeded(),
-        'break2_minutes_exceeded': time_allocation.break2_minutes_exceeded(),
-        'lunch_minutes_exceeded': time_allocation.lunch_minutes_exceeded(),
-        'is_break1_exceeded': time_allocation.is_break1_exceeded(),
-        'is_break2_exceeded': time_allocation.is_break2_exceeded(),
-        'is_lunch_exceeded': time_allocation.is_lunch_exceeded(),
-        'ongoing_break1': ongoing_break1,
-        'ongoing_break2': ongoing_break2,
-        'ongoing_lunch': ongoing_lunch,
-        'current_status': current_status,
-        'break1_minutes_used': time_allocation.break1_minutes_used,
-        'break2_minutes_used': time_allocation.break2_minutes_used,
-        'lunch_minutes_used': time_allocation.lunch_minutes_used,
-        'break1_percentage': break1_percentage,
-        'break2_percentage': break2_percentage,
-        'lunch_percentage': lunch_percentage,
-        'is_clocked_in': is_clocked_in,
-        'can_perform_clock_actions': can_perform_clock_actions,
+        **state['context'],
         'shift_start_time': '10:00 PM',
         'shift_end_time': '7:00 AM',
+        'status_etag': status_etag(request.user.id) if is_today else None,
+        'idempotency_key': uuid.uuid4().hex,
     }
     
-    # Add timestamps for ongoing activities
-    if ongoing_break1:
-        context['break1_start_time'] = time_allocation.break1_start_time
-    
-    if ongoing_break2:
-        context['break2_start_time'] = time_allocation.break2_start_time
-    
-    if ongoing_lunch:
-        context['lunch_start_time'] = time_allocation.lunch_start_time
-    
     return render(request, 'tracker.html', context)
 
 # 📊 USER DASHBOARD
 @login_required
 def dashboard(request):
-    logs = AttendanceLog.objects.filter(user=request.user).order_by('-timestamp')
-    return render(request, 'dashboard.html', {'logs': logs})
+    # Archived months are only read when asked for with ?archive=YYYY-MM
+    archived = requested_archive(request)
+    logs = (AttendanceLog.objects if archived is None else archived).filter(user=request.user)
+    
+    # Keyset pagination keeps each page O(page size) however long the history is
+    page_obj = keyset_paginate(logs, 50, after=request.GET.get('after'), before=request.GET.get('before'))
+    
+    return render(request, 'dashboard.html', {
+        'logs': page_obj,
+        'page_obj': page_obj,
+        'pagination_query': cursor_querystring(request),
+        'archive_month': request.GET.get('archive') if archived is not None else None,
+    })
+
+def requested_archive(request):
+    """The archived logs of the month in ?archive=YYYY-MM, or None to read the hot table."""
+    month = request.GET.get('archive')
+    if not month:
+        return None
+    try:
+        return archived_logs(month)
+    except ValueError:
+        return None
 
 # 📊 ADMIN DASHBOARD
 @user_passes_test(lambda u: u.is_superuser)
@@ -436,87 +329,44 @@ def admin_dashboard(request):
     if selected_date:
         try:
             filter_date = datetime.strptime(selected_date, '%Y-%m-%d').date()
-            logs_query = logs_query.filter(timestamp__date=filter_date)
+            logs_query = logs_query.filter(shift_date=filter_date)
         except ValueError:
             pass
     
     # Order logs
     logs = logs_query.order_by('-timestamp')
     
-    # Pagination with the selected page size
-    page = request.GET.get('page', 1)
-    paginator = Paginator(logs, page_size)
-    
-    try:
-        page_obj = paginator.page(page)
-    except PageNotAnInteger:
-        page_obj = paginator.page(1)
-    except EmptyPage:
-        page_obj = paginator.page(paginator.num_pages)
+    # Keyset pagination with the selected page size (no OFFSET or COUNT(*))
+    page_obj = keyset_paginate(logs, page_size, after=request.GET.get('after'), before=request.GET.get('before'))
     
     # Get all users (for filter dropdown and sidebar)
     users = User.objects.all().order_by('username')
     
     # Calculate current stats
-    today = date.today()
     total_users = User.objects.count()
     
-    # Track user statuses for sidebar
-    clocked_in_users = set()
-    break_users = set()
-    lunch_users = set()
-    
-    # Find users currently clocked in, on break, or lunch
-    for user_obj in users:
-        # Check if user is clocked in
-        clock_ins_today = AttendanceLog.objects.filter(
-            user=user_obj,
-            action='clock_in',
-            timestamp__date=today
-        ).count()
-        
-        clock_outs_today = AttendanceLog.objects.filter(
-            user=user_obj,
-            action='clock_out',
-            timestamp__date=today
-        ).count()
-        
-        if clock_ins_today > clock_outs_today:
-            clocked_in_users.add(user_obj.id)
-            
-            # Check if they're on break or lunch
-            try:
-                time_allocation = DailyTimeAllocation.objects.get(user=user_obj, date=today)
-                if time_allocation.break1_start_time or time_allocation.break2_start_time:
-                    break_users.add(user_obj.id)
-                if time_allocation.lunch_start_time:
-                    lunch_users.add(user_obj.id)
-            except DailyTimeAllocation.DoesNotExist:
-                pass
-    
-    # Get time allocations for all users for their log dates
+    # Track user statuses for sidebar (read from the presence table)
+    clocked_in_users, break_users, lunch_users = compute_roster()
+    
+    # Time allocations for the (user, shift date) pairs visible on this page only,
+    # in one query; missing ones are simply absent (nothing is created on a GET)
     # Create a nested dictionary: {user_id: {date: allocation}}
     user_time_allocations = defaultdict(dict)
     
-    # Get unique user and date combinations from the logs
-    user_date_pairs = logs.values('user_id', 'timestamp__date').distinct()
-    
-    for pair in user_date_pairs:
-        user_id = pair['user_id']
-        log_date = pair['timestamp__date']
+    visible_pairs = {(log.user_id, log.shift_date) for log in page_obj}
+    if visible_pairs:
+        pair_filter = Q()
+        for user_id, shift_date in visible_pairs:
+            pair_filter |= Q(user_id=user_id, date=shift_date)
         
-        # Get or create time allocation for this user and date
-        time_allocation, _ = DailyTimeAllocation.objects.get_or_create(
-            user_id=user_id,
-            date=log_date
-        )
-        
-        # Store in our dictionary
-        user_time_allocations[user_id][log_date] = time_allocation
+        for time_allocation in DailyTimeAllocation.objects.filter(pair_filter):
+            user_time_allocations[time_allocation.user_id][time_allocation.date] = time_allocation
     
     context = {
         'logs': page_obj,
         'page_obj': page_obj,
+        'pagination_query': cursor_querystring(request),
+        'page_size': page_size,
         'users': users,
         'selected_user': selected_user,
         'selected_user_obj': selected_user_obj,
@@ -536,6 +386,18 @@ def admin_dashboard(request):
 # 📤 EXPORT USER CSV
 @login_required
 def export_csv(request):
+    # Plain csv/jsonl: streamed rows, no workbook and no styling
+    export_format = request.GET.get('format', 'xlsx')
+    archived = requested_archive(request)
+    if export_format in TEXT_EXPORT_FORMATS:
+        logs = (AttendanceLog.objects if archived is None else archived).filter(user=request.user).order_by('-timestamp')
+        current_month_year = datetime.now().strftime('%B_%Y')
+        return text_export_response(
+            activity_export_lines(logs, export_format),
+            export_format,
+            f"{request.user.username}_activity_log_{current_month_year}",
+        )
+    
     # Import the necessary libraries
     import openpyxl
     from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
@@ -565,6 +427,10 @@ def export_csv(request):
     # Set up headers for activity sheet
     headers = ["Date", "Time", "Action", "Status", "Note"]
     
+    # Track column widths while rows are written (applied once at the end)
+    width_tracker = ColumnWidthTracker()
+    width_tracker.track(headers)
+    
     # Apply headers with styling
     for col_num, header in enumerate(headers, 1):
         cell = activity_sheet.cell(row=1, column=col_num)
@@ -575,7 +441,7 @@ def export_csv(request):
         cell.border = thin_border
     
     # Get all logs for the user, ordered by timestamp
-    logs = AttendanceLog.objects.filter(user=request.user).order_by('-timestamp')
+    logs = (AttendanceLog.objects if archived is None else archived).filter(user=request.user).order_by('-timestamp')
     
     # Process each log entry
     row = 2
@@ -610,16 +476,15 @@ def export_csv(request):
                 cell.fill = row_style
         
         # Add data to the sheet
-        activity_sheet.cell(row=row, column=1).value = log_date
-        activity_sheet.cell(row=row, column=2).value = log_time
-        activity_sheet.cell(row=row, column=3).value = action
-        activity_sheet.cell(row=row, column=4).value = status
-        activity_sheet.cell(row=row, column=5).value = log.note or ""
+        values = [log_date, log_time, action, status, log.note or ""]
+        for col, value in enumerate(values, 1):
+            activity_sheet.cell(row=row, column=col).value = value
+        width_tracker.track(values)
         
         row += 1
     
-    # Adjust column widths using helper function
-    adjust_column_widths(activity_sheet)
+    # Apply the widths recorded while writing
+    width_tracker.apply(activity_sheet)
     
     # Set up print settings
     activity_sheet.page_setup.orientation = activity_sheet.ORIENTATION_LANDSCAPE
@@ -654,6 +519,30 @@ def admin_export_csv(request):
     # Get specific user parameter if provided
     selected_user_id = request.GET.get('user')
     
+    # Plain csv/jsonl: streamed rows, no workbook and no styling
+    export_format = request.GET.get('format', 'xlsx')
+    archived = requested_archive(request)
+    if archived is not None and export_format not in TEXT_EXPORT_FORMATS:
+        return HttpResponseBadRequest('Archived months export as csv or jsonl.')
+    if export_format in TEXT_EXPORT_FORMATS:
+        logs = AttendanceLog.objects.all() if archived is None else archived
+        if selected_user_id:
+            logs = logs.filter(user_id=selected_user_id)
+            username = User.objects.filter(id=selected_user_id).values_list('username', flat=True).first()
+            filename_prefix = f"user_{username}_activity"
+        else:
+            filename_prefix = "all_users_activity"
+        current_month_year = datetime.now().strftime('%B_%Y')
+        return text_export_response(
+            activity_export_lines(logs.order_by('user__username', 'user_id', '-timestamp'), export_format, include_username=True),
+            export_format,
+            f"{filename_prefix}_{current_month_year}",
+        )
+    
+    # Streaming mode: write-only sheets filled from chunked queries into a temp file
+    if request.GET.get('mode') == 'stream':
+        return admin_export_streaming(selected_user_id)
+    
     # Create a new workbook
     wb = openpyxl.Workbook()
     
@@ -681,6 +570,10 @@ def admin_export_csv(request):
     # Set up headers for summary sheet - simplified to match user export
     summary_headers = ["Username", "Date", "Time", "Action", "Status", "Note"]
     
+    # Track summary column widths while rows are written
+    summary_width_tracker = ColumnWidthTracker()
+    summary_width_tracker.track(summary_headers)
+    
     # Apply headers to summary sheet with styling
     for col_num, header in enumerate(summary_headers, 1):
         cell = summary_sheet.cell(row=1, column=col_num)
@@ -739,6 +632,10 @@ def admin_export_csv(request):
         user_header.font = Font(bold=True, size=14)
         user_header.alignment = Alignment(horizontal='center')
         
+        # Track this sheet's column widths (the merged title row is left out)
+        user_width_tracker = ColumnWidthTracker()
+        user_width_tracker.track(user_headers)
+        
         # Apply headers with styling (in row 2)
         for col_num, header in enumerate(user_headers, 1):
             cell = user_sheet.cell(row=2, column=col_num)
@@ -782,11 +679,10 @@ def admin_export_csv(request):
                     cell.fill = row_style
             
             # Add data to the user sheet
-            user_sheet.cell(row=user_row, column=1).value = log_date
-            user_sheet.cell(row=user_row, column=2).value = log_time
-            user_sheet.cell(row=user_row, column=3).value = action
-            user_sheet.cell(row=user_row, column=4).value = status
-            user_sheet.cell(row=user_row, column=5).value = log.note or ""
+            values = [log_date, log_time, action, status, log.note or ""]
+            for col, value in enumerate(values, 1):
+                user_sheet.cell(row=user_row, column=col).value = value
+            user_width_tracker.track(values)
             
             user_row += 1
             
@@ -802,25 +698,23 @@ def admin_export_csv(request):
                     cell.fill = row_style
             
             # Add data to the summary sheet
-            summary_sheet.cell(row=summary_row, column=1).value = user.username
-            summary_sheet.cell(row=summary_row, column=2).value = log_date
-            summary_sheet.cell(row=summary_row, column=3).value = log_time
-            summary_sheet.cell(row=summary_row, column=4).value = action
-            summary_sheet.cell(row=summary_row, column=5).value = status
-            summary_sheet.cell(row=summary_row, column=6).value = log.note or ""
+            summary_values = [user.username] + values
+            for col, value in enumerate(summary_values, 1):
+                summary_sheet.cell(row=summary_row, column=col).value = value
+            summary_width_tracker.track(summary_values)
             
             summary_row += 1
         
-        # Use our helper function to adjust column widths safely for user sheet
-        adjust_column_widths(user_sheet)
+        # Apply the widths recorded while writing the user sheet
+        user_width_tracker.apply(user_sheet)
         
         # Set print area and page setup for user sheet
         user_sheet.page_setup.orientation = user_sheet.ORIENTATION_LANDSCAPE
         user_sheet.page_setup.fitToWidth = True
         user_sheet.print_title_rows = '1:2'  # Repeat header rows on each page
     
-    # Use our helper function to adjust column widths safely for summary sheet
-    adjust_column_widths(summary_sheet)
+    # Apply the widths recorded while writing the summary sheet
+    summary_width_tracker.apply(summary_sheet)
     
     # Set summary sheet as the active sheet
     wb.active = summary_sheet
@@ -842,28 +736,192 @@ def admin_export_csv(request):
     
     return response
 
-# Modified function to safely handle column width adjustment
-
-def adjust_column_widths(sheet):
-    """Helper function to safely adjust column widths"""
-    for col_idx in range(1, sheet.max_column + 1):
-        column_letter = get_column_letter(col_idx)
-        max_length = 0
-        
-        # Check each cell in the column
-        for row_idx in range(1, sheet.max_row + 1):
-            cell = sheet.cell(row=row_idx, column=col_idx)
-            # Only process if it's a normal cell (not merged) and has a value
-            if cell.__class__.__name__ != 'MergedCell' and cell.value:
-                try:
-                    cell_length = len(str(cell.value))
-                    max_length = max(max_length, cell_length)
-                except:
-                    pass
-        
-        # Set column width
-        adjusted_width = max(max_length + 2, 12)  # Minimum width of 12
-        sheet.column_dimensions[column_letter].width = adjusted_width
+def admin_export_streaming(selected_user_id):
+    """Stream the admin export from a temporary file so peak memory stays flat."""
+    if selected_user_id:
+        username = User.objects.filter(id=selected_user_id).values_list('username', flat=True).first()
+        filename_prefix = f"user_{username}_activity"
+    else:
+        filename_prefix = "all_users_activity"
+    
+    # Anonymous temp file, removed by the OS once the response closes it
+    output = tempfile.TemporaryFile()
+    write_streaming_admin_workbook(output, user_id=selected_user_id)
+    output.seek(0)
+    
+    current_month_year = datetime.now().strftime('%B_%Y')
+    filename = f"{filename_prefix}_{current_month_year}.xlsx"
+    
+    return FileResponse(output, as_attachment=True, filename=filename, content_type=XLSX_CONTENT_TYPE)
+
+def activity_export_lines(logs, export_format, include_username=False):
+    """Encoded lines of an activity export; csv comes straight from COPY on PostgreSQL."""
+    headers = SUMMARY_HEADERS if include_username else ACTIVITY_HEADERS
+    if export_format == 'csv' and is_postgresql(logs.db):
+        return stream_copy_csv(logs, headers, include_username)
+    return stream_text_export(iter_activity_rows(logs, include_username), headers, export_format)
+
+def text_export_response(lines, export_format, filename_base):
+    """Stream a csv or jsonl export at constant memory."""
+    response = StreamingHttpResponse(lines, content_type=TEXT_EXPORT_FORMATS[export_format])
+    response['Content-Disposition'] = f'attachment; filename="{filename_base}.{export_format}"'
+    return response
+
+# 📦 BACKGROUND EXPORT JOBS
+def export_job_payload(job):
+    """JSON body describing an export job for the dashboard poller."""
+    payload = {
+        'id': job.pk,
+        'status': job.status,
+        'rows_processed': job.rows_processed,
+        'total_rows': job.total_rows,
+        'progress': job.progress_percentage(),
+        'status_url': reverse('admin_export_job_status', args=[job.pk]),
+    }
+    if job.status == ExportJob.DONE:
+        payload['download_url'] = reverse('admin_export_job_download', args=[job.pk])
+    if job.status == ExportJob.FAILED:
+        payload['error'] = job.error
+    return payload
+
+@user_passes_test(lambda u: u.is_superuser)
+@require_POST
+def admin_export_job_start(request):
+    selected_user_id = request.POST.get('user')
+    try:
+        params = {'user': int(selected_user_id) if selected_user_id else None}
+    except ValueError:
+        return JsonResponse({'error': 'Invalid user'}, status=400)
+    
+    # Identical exports requested within the TTL share one job
+    job, created = enqueue_export(request.user, params)
+    return JsonResponse(export_job_payload(job), status=201 if created else 200)
+
+@user_passes_test(lambda u: u.is_superuser)
+def admin_export_job_status(request, job_id):
+    job = get_object_or_404(ExportJob, pk=job_id)
+    return JsonResponse(export_job_payload(job))
+
+@user_passes_test(lambda u: u.is_superuser)
+def admin_export_job_download(request, job_id):
+    job = get_object_or_404(ExportJob, pk=job_id, status=ExportJob.DONE)
+    if not os.path.exists(job.file_path):
+        raise Http404("Export file has expired")
+    return FileResponse(open(job.file_path, 'rb'), as_attachment=True, filename=job.filename, content_type=XLSX_CONTENT_TYPE)
+
+# 📡 LIVE ROSTER FEED (Server-Sent Events, served under ASGI)
+async def admin_roster_events(request):
+    """Stream roster changes to the admin dashboard: a snapshot first, then one event per tracker action."""
+    user = await request.auser()
+    if not user.is_superuser:
+        return HttpResponseForbidden()
+    
+    # Under WSGI an open stream would pin a worker thread all night: 204 tells EventSource to stop
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)
+    
+    return StreamingHttpResponse(
+        roster_event_stream(),
+        content_type='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
+
+def sse_message(event, data, event_id=None):
+    lines = [f"id: {event_id}"] if event_id else []
+    lines += [f"event: {event}", f"data: {json.dumps(data)}"]
+    return "\n".join(lines) + "\n\n"
+
+async def roster_snapshot():
+    """Current non-idle state of every user, read from the presence table."""
+    states = await sync_to_async(
+        lambda: dict(UserPresence.active().values_list('user_id', 'state'))
+    )()
+    return sse_message('snapshot', {'states': states})
+
+async def roster_event_stream():
+    broadcast = get_broadcast()
+    queue = broadcast.subscribe()
+    try:
+        yield "retry: 5000\n\n"
+        yield await roster_snapshot()
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), timeout=settings.ROSTER_KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                # Comment line keeps proxies from closing an idle connection
+                yield ": keepalive\n\n"
+                continue
+            if event is RESYNC:
+                yield await roster_snapshot()
+            else:
+                yield sse_message('roster', event, event['id'])
+    finally:
+        broadcast.unsubscribe(queue)
+
+# 🔄 STATUS API (polled by the tracker page)
+@condition(etag_func=session_status_etag)
+def api_status(request):
+    """Current state and break/lunch minutes; unchanged polls get a 304 before any database query."""
+    if not request.user.is_authenticated:
+        return JsonResponse({'error': 'Authentication required'}, status=401)
+    
+    etag = status_etag(request.user.id)
+    response = JsonResponse(get_status(request.user.id, etag))
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+# 📈 METRICS
+@user_passes_test(lambda u: u.is_superuser)
+def admin_metrics(request):
+    """Counters of this worker process, such as tracker cache hits and misses."""
+    return JsonResponse({
+        'counters': metrics.counter_values(),
+        'tracker_cache_hit_ratio': metrics.hit_ratio('tracker_cache_hits', 'tracker_cache_misses'),
+        'requests': metrics.histogram_summaries(),
+    })
+
+def admin_metrics_prometheus(request):
+    """
+    The same counters and the request histograms in the Prometheus text format, for scrapers.
+
+    The values belong to the worker process that serves the scrape. Behind several
+    workers each scrape lands on a different one, and the _total counters seem to
+    reset all the time: scrape it only with a single worker process (threads are fine).
+    """
+    token = settings.METRICS_TOKEN
+    authorized = request.user.is_superuser or (
+        token and constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}')
+    )
+    if not authorized:
+        return HttpResponseForbidden('Superuser or metrics token required.')
+    return HttpResponse(metrics.prometheus_text(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+# 💰 MONTHLY PAYROLL REPORT
+@user_passes_test(lambda u: u.is_superuser)
+def admin_payroll_report(request):
+    """Worked hours, overtime, lateness and break overruns per agent for one month (?month=YYYY-MM)."""
+    month = request.GET.get('month') or get_shift_date(timezone.now()).strftime('%Y-%m')
+    try:
+        first, last = month_bounds(month)
+    except ValueError:
+        return HttpResponse("Invalid month, expected YYYY-MM", status=400)
+    
+    rows = payroll_rows(first)
+    filename = f"payroll_{first.strftime('%B_%Y')}"
+    
+    if request.GET.get('format') == 'csv':
+        response = HttpResponse(content_type='text/csv')
+        response['Content-Disposition'] = f'attachment; filename="{filename}.csv"'
+        write_payroll_csv(rows, response)
+        return response
+    
+    from io import BytesIO
+    output = BytesIO()
+    write_payroll_workbook(rows, output, first.strftime('%B %Y'))
+    response = HttpResponse(output.getvalue(), content_type=XLSX_CONTENT_TYPE)
+    response['Content-Disposition'] = f'attachment; filename="{filename}.xlsx"'
+    return response
 
 # Automatic clock out function
 def auto_clock_out_at_shift_end():
@@ -875,4 +933,12 @@ def auto_clock_out_at_shift_end():
     manila_tz = pytz.timezone('Asia/Manila')
     now_manila = now.astimezone(manila_tz)
     
-    # Rest of the function...
+    # Set-based close: a handful of queries however many users are still on shift
+    counts = close_open_shifts(now)
+    
+    return (
+        f"Shift closed at {now_manila.strftime('%Y-%m-%d %I:%M %p')}: "
+        f"{counts['clock_out']} clocked out, "
+        f"{counts['end_break1']} break 1, {counts['end_break2']} break 2 "
+        f"and {counts['end_lunch']} lunch interval(s) ended"
+    )
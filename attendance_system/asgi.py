@@ -1 +1,8 @@
-# asgi placeholder
\ No newline at end of file
+import os
+from django.core.asgi import get_asgi_application
+
+# Set the default settings module for the 'attendance_system' project.
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'attendance_system.settings')
+
+# Serve with an ASGI server (e.g. uvicorn attendance_system.asgi:application) for the live roster feed
+application = get_asgi_application()
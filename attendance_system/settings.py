@@ -25,6 +25,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'attendance_app.instrumentation.RequestInstrumentationMiddleware',  # Outermost, so it sees every query
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -38,7 +39,7 @@ ROOT_URLCONF = 'attendance_system.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'attendance_app.instrumentation.InstrumentedDjangoTemplates',  # DjangoTemplates that time their render
         'DIRS': [
             BASE_DIR / 'attendance_app/templates',  # Add this to point to your templates folder
         ],
@@ -56,13 +57,55 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'attendance_system.wsgi.application'
 
-# Database
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',  # SQLite as the database backend
-        'NAME': BASE_DIR / 'db.seaamos.sqlite3',  # Path to your SQLite database file
+# Database: SQLite by default. Set DB_ENGINE=postgresql (with DB_NAME, DB_USER, DB_PASSWORD,
+# DB_HOST and DB_PORT) to run on PostgreSQL, which enables the fast paths in attendance_app.postgres.
+DB_ENGINE = os.environ.get('DB_ENGINE', 'sqlite')
+if DB_ENGINE == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('DB_NAME', 'attendance'),
+            'USER': os.environ.get('DB_USER', 'postgres'),
+            'PASSWORD': os.environ.get('DB_PASSWORD', ''),
+            'HOST': os.environ.get('DB_HOST', 'localhost'),
+            'PORT': os.environ.get('DB_PORT', '5432'),
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',  # SQLite as the database backend
+            'NAME': os.environ.get('DB_NAME', BASE_DIR / 'db.seaamos.sqlite3'),  # Path to your SQLite database file
+            'OPTIONS': {
+                # Take the write lock when a transaction starts, so concurrent writers wait
+                # instead of failing when upgrading a read lock
+                'transaction_mode': 'IMMEDIATE',
+                # Seconds to wait for the write lock (SQLite's busy timeout, set at connect time)
+                'timeout': 20,
+            },
+        }
     }
+# Persistent connections: reused across requests for this many seconds (0 closes after each
+# request), and checked before reuse so a dropped connection is replaced instead of failing
+DATABASES['default']['CONN_MAX_AGE'] = int(os.environ.get('DB_CONN_MAX_AGE', 60))
+DATABASES['default']['CONN_HEALTH_CHECKS'] = True
+
+# Applied to every new SQLite connection (attendance_app.sqlite.configure_sqlite). No busy_timeout
+# here: it would override OPTIONS['timeout'] above, the one setting for the lock wait.
+SQLITE_PRAGMAS = {
+    'mmap_size': 128 * 1024 * 1024,
+    'cache_size': -20000,  # Negative means KiB: about 20 MB of page cache
 }
+# WAL is opt-in (SQLITE_WAL=1): it is stored in the database file itself and keeps -wal/-shm files
+# beside it, so it is meant for a deployed database rather than the one checked into the repo
+if os.environ.get('SQLITE_WAL') == '1':
+    SQLITE_PRAGMAS.update({
+        'journal_mode': 'WAL',  # Readers no longer block the writer and vice versa
+        'synchronous': 'NORMAL',  # Safe with WAL, fsync only at checkpoints
+    })
+# Retries of tracker writes that still hit "database is locked", with exponential backoff
+SQLITE_LOCK_RETRIES = 5
+SQLITE_LOCK_BACKOFF_SECONDS = 0.05
 
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
@@ -94,6 +137,96 @@ USE_TZ = True
 STATIC_URL = '/static/'
 STATICFILES_DIRS = [BASE_DIR / "static"]
 
+# Background admin exports: where the worker writes files, how long identical requests reuse a job,
+# and how long a running job may go without progress before it counts as abandoned by a killed worker
+EXPORT_ROOT = BASE_DIR / 'exports'
+EXPORT_JOB_TTL_SECONDS = 15 * 60
+EXPORT_JOB_TIMEOUT_SECONDS = 10 * 60
+
+# Cache for the status API and the tracker state. Local memory (the default) is per process:
+# run several workers only with CACHE_BACKEND=file, redis or memcached and a shared CACHE_LOCATION.
+CACHE_BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+    'redis': 'django.core.cache.backends.redis.RedisCache',
+    'memcached': 'django.core.cache.backends.memcached.PyMemcacheCache',
+}
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'locmem')
+CACHE_LOCATION = os.environ.get('CACHE_LOCATION', str(BASE_DIR / 'cache'))
+# Agents the caches are sized for: local memory and file caches cull entries past MAX_ENTRIES
+# (300 unless set), and a culled status version changes every ETag and reloads tracker pages
+WORKFORCE_SIZE = int(os.environ.get('WORKFORCE_SIZE', 1000))
+
+
+def cache_alias(name, max_entries):
+    """One cache alias on the configured backend, kept apart from the others by name."""
+    if CACHE_BACKEND == 'locmem':
+        return {'BACKEND': CACHE_BACKENDS['locmem'], 'LOCATION': name, 'OPTIONS': {'MAX_ENTRIES': max_entries}}
+    if CACHE_BACKEND == 'file':
+        return {
+            'BACKEND': CACHE_BACKENDS['file'],
+            'LOCATION': os.path.join(CACHE_LOCATION, name),
+            'OPTIONS': {'MAX_ENTRIES': max_entries},
+        }
+    # Redis and memcached evict by memory, not entry count: one server, one key prefix per alias
+    return {'BACKEND': CACHE_BACKENDS[CACHE_BACKEND], 'LOCATION': CACHE_LOCATION, 'KEY_PREFIX': name}
+
+
+CACHES = {
+    # Sessions and status payloads
+    'default': cache_alias('default', WORKFORCE_SIZE * 4),
+    # Status versions only, one per agent, so sessions and payloads never push them out
+    'status_versions': cache_alias('status_versions', WORKFORCE_SIZE * 2),
+    # Tracker states: one per agent and version, older versions linger until TRACKER_CACHE_SECONDS
+    'tracker': cache_alias('tracker', WORKFORCE_SIZE * 4),
+}
+# Sessions are read from the cache first, so status polls need no database query
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+STATUS_CACHE_SECONDS = 10 * 60
+
+# Per-user tracker state cache (invalidated by every action through the status version)
+TRACKER_CACHE_ALIAS = 'tracker'
+TRACKER_CACHE_SECONDS = 60 * 60
+
+# Live roster feed: the hub that fans tracker events out to dashboards. The in-process hub
+# only reaches dashboards on the same worker; use attendance_app.broadcast.RedisBroadcast
+# (with ROSTER_BROADCAST_URL) to share events between workers.
+ROSTER_BROADCAST_BACKEND = 'attendance_app.broadcast.InProcessBroadcast'
+ROSTER_BROADCAST_URL = 'redis://localhost:6379/0'
+ROSTER_KEEPALIVE_SECONDS = 15
+
+# Whole months of AttendanceLog older than this move to the archive table (archive_logs command,
+# and the monthly scheduler job). Views read the archive only when asked with ?archive=YYYY-MM.
+ATTENDANCE_LOG_RETENTION_MONTHS = 12
+
+# Request instrumentation: url names left out of the metrics, and per-view budgets. A request over
+# its budget logs a warning with its most frequent SQL fingerprints.
+REQUEST_METRICS_EXCLUDE = ['admin_roster_events', 'admin_metrics', 'admin_metrics_prometheus']
+REQUEST_BUDGETS = {
+    'tracker': {'queries': 25, 'duration_ms': 300},
+    'dashboard': {'queries': 10, 'duration_ms': 300},
+    'admin_dashboard': {'queries': 20, 'duration_ms': 500},
+    'export_csv': {'queries': 10, 'duration_ms': 5000},
+    'admin_export_csv': {'queries': 20, 'duration_ms': 30000},
+}
+# Bearer token a Prometheus scraper sends to /admin-metrics/prometheus/ (superusers need none).
+# The metrics are per process: scrape that endpoint only when running a single worker process.
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'attendance_app': {'handlers': ['console'], 'level': 'INFO'},
+    },
+}
+
+# In-process scheduler: how long a node may hold a job's lease before another node can take over
+SCHEDULER_LEASE_SECONDS = 30 * 60
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 